@@ -0,0 +1,41 @@
+"""Benchmark of reading the tracks file with a column projection versus a csv.DictReader row per line.
+
+Reports the time to read every row and the peak memory of holding all rows, for both readers.
+
+    python -m benchmarks.bench_csv_projection [tracks_csv_file]
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from music.adapters.csvdatareader import TrackCSVReader
+
+DATA_PATH = Path(__file__).parent.parent / 'music' / 'adapters' / 'data'
+
+
+def measure(read_rows, repeat: int = 5):
+    elapsed = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        number_of_rows = sum(1 for _ in read_rows())
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    tracemalloc.start()
+    rows = list(read_rows())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del rows
+    return number_of_rows, elapsed, peak
+
+
+def main(tracks_csv_file: str = str(DATA_PATH / 'raw_tracks_excerpt.csv')):
+    reader = TrackCSVReader(str(DATA_PATH / 'raw_albums_excerpt.csv'), tracks_csv_file)
+    for name, read_rows in (('DictReader', reader.iter_track_rows), ('projection', reader.iter_projected_track_rows)):
+        number_of_rows, elapsed, peak = measure(read_rows)
+        print(f'{name:>10}: {elapsed * 1000:8.2f} ms for {number_of_rows} rows, '
+              f'peak {peak / 1024 / 1024:7.2f} MiB holding all rows')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,61 @@
+"""Benchmark of serial versus process-parallel parsing of a large tracks file.
+
+Builds a synthetic tracks file by repeating the excerpt with fresh track ids, then times read_csv_files and
+read_csv_files_parallel with an increasing number of processes.
+
+    python -m benchmarks.bench_parallel_ingest [copies]
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from music.adapters.csvdatareader import TrackCSVReader
+
+DATA_PATH = Path(__file__).parent.parent / 'music' / 'adapters' / 'data'
+
+
+def write_large_tracks_file(filename: str, copies: int):
+    # latin-1 maps bytes to characters one to one, so the escape sequences of the excerpt are kept verbatim.
+    with open(DATA_PATH / 'raw_tracks_excerpt.csv', encoding='latin-1', newline='') as excerpt:
+        rows = list(csv.reader(excerpt))
+    header, rows = rows[0], rows[1:]
+    track_id = header.index('track_id')
+    offset = max(int(row[track_id]) for row in rows) + 1
+
+    with open(filename, 'w', encoding='latin-1', newline='') as large:
+        writer = csv.writer(large)
+        writer.writerow(header)
+        for copy in range(copies):
+            for row in rows:
+                row = list(row)
+                row[track_id] = str(int(row[track_id]) + copy * offset)
+                writer.writerow(row)
+
+
+def main(copies: int = 50):
+    albums_csv_file = str(DATA_PATH / 'raw_albums_excerpt.csv')
+    with tempfile.TemporaryDirectory() as directory:
+        tracks_csv_file = os.path.join(directory, 'raw_tracks_large.csv')
+        write_large_tracks_file(tracks_csv_file, int(copies))
+
+        reader = TrackCSVReader(albums_csv_file, tracks_csv_file)
+        start = time.perf_counter()
+        reader.read_csv_files()
+        serial = time.perf_counter() - start
+        print(f'  serial: {serial:6.2f}s for {len(reader.dataset_of_tracks)} tracks')
+
+        processes = 2
+        while processes <= (os.cpu_count() or 1) * 2:
+            reader = TrackCSVReader(albums_csv_file, tracks_csv_file)
+            start = time.perf_counter()
+            reader.read_csv_files_parallel(processes)
+            elapsed = time.perf_counter() - start
+            print(f'{processes:2d} procs: {elapsed:6.2f}s (speedup {serial / elapsed:.2f}x)')
+            processes *= 2
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,92 @@
+"""Benchmark of database repository reads while reviews are being written, with and without the SQLite profile.
+
+Bulk loads the tracks into a file database, then runs reader threads that page through tracks and a track's
+reviews next to a writer thread that keeps posting reviews, first with SQLite's default journaling and then with
+enable_sqlite_performance_profile.
+
+    python -m benchmarks.bench_sqlite_profile [seconds] [readers]
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from music.adapters import repository_populate
+from music.adapters.database_repository import (
+    SqlAlchemyRepository, create_database_engine, enable_sqlite_performance_profile
+)
+from music.adapters.orm import metadata, map_model_to_tables
+from music.domainmodel.review import Review
+
+DATA_PATH = Path(__file__).parent.parent / 'music' / 'adapters' / 'data'
+
+
+def populated_repository(database_file: str, readers: int, tuned: bool) -> SqlAlchemyRepository:
+    engine = create_database_engine(f'sqlite:///{database_file}', pool='queue', pool_size=readers + 1)
+    if tuned:
+        enable_sqlite_performance_profile(engine)
+    clear_mappers()
+    metadata.create_all(engine)
+    map_model_to_tables()
+    repo = SqlAlchemyRepository(sessionmaker(autocommit=False, autoflush=True, bind=engine))
+    repository_populate.populate(DATA_PATH, repo, False, bulk=True)
+    return repo
+
+
+def run(repo: SqlAlchemyRepository, seconds: float, readers: int) -> dict:
+    track_ids = [track.track_id for track in repo.get_tracks_page(0, 100)]
+    number_of_tracks = repo.get_number_of_tracks()
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def count(key: str):
+        with lock:
+            counts[key] += 1
+
+    def read():
+        while time.perf_counter() < stop:
+            try:
+                repo.get_tracks_page(random.randrange(number_of_tracks), 15)
+                repo.get_reviews_page(repo.get_track(random.choice(track_ids)), 0, 10)
+                count('reads')
+            except OperationalError:
+                count('errors')
+            repo.reset_session()
+
+    def write():
+        while time.perf_counter() < stop:
+            try:
+                repo.add_review(Review(repo.get_track(random.choice(track_ids)), 'Benchmark review', 4))
+                count('writes')
+            except OperationalError:
+                count('errors')
+            repo.reset_session()
+
+    threads = [threading.Thread(target=read) for _ in range(readers)] + [threading.Thread(target=write)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+def main(seconds: float = 5, readers: int = 4):
+    seconds, readers = float(seconds), int(readers)
+    for name, tuned in (('default', False), ('tuned', True)):
+        with tempfile.TemporaryDirectory() as directory:
+            repo = populated_repository(os.path.join(directory, 'music.db'), readers, tuned)
+            counts = run(repo, seconds, readers)
+            repo.close_session()
+        print(f'{name:>8}: {counts["reads"] / seconds:8.1f} reads/s  {counts["writes"] / seconds:7.1f} writes/s  '
+              f'{counts["errors"]} lock errors')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
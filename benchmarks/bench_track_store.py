@@ -0,0 +1,68 @@
+"""Benchmark of the memory held per track by the object and the columnar track stores.
+
+Parses a tracks file built from copies of the excerpt, loads the tracks into each store, drops everything but
+the store and reports the memory still allocated, as traced by tracemalloc, per stored track. Artists, albums
+and genres referenced by the tracks are included. The same tracks are then loaded into a whole MemoryRepository
+using each store, so the figures also cover its posting lists, catalogue listings and search index.
+
+    python -m benchmarks.bench_track_store [copies]
+"""
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.bench_parallel_ingest import write_large_tracks_file
+from music.adapters.csvdatareader import TrackCSVReader
+from music.adapters.memory_repository import MemoryRepository
+from music.adapters.track_store import TRACK_STORES
+
+DATA_PATH = Path(__file__).parent.parent / 'music' / 'adapters' / 'data'
+
+
+def load_store(track_store: str, reader: TrackCSVReader):
+    store = TRACK_STORES[track_store]()
+    store.load(reader.dataset_of_tracks)
+    return store
+
+
+def load_repository(track_store: str, reader: TrackCSVReader) -> MemoryRepository:
+    repo = MemoryRepository(track_store=track_store)
+    repo.load_tracks(reader.dataset_of_tracks)
+    repo.load_artists(reader.dataset_of_artists)
+    repo.load_genres(reader.dataset_of_genres)
+    repo.load_albums(reader.dataset_of_albums)
+    return repo
+
+
+def measure(load, track_store: str, albums_csv_file: str, tracks_csv_file: str) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    reader = TrackCSVReader(albums_csv_file, tracks_csv_file)
+    reader.read_csv_files()
+    tracks = len(reader.dataset_of_tracks)
+    loaded = load(track_store, reader)
+    del reader
+    gc.collect()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loaded
+    return tracks, allocated
+
+
+def main(copies: int = 25):
+    albums_csv_file = str(DATA_PATH / 'raw_albums_excerpt.csv')
+    with tempfile.TemporaryDirectory() as directory:
+        tracks_csv_file = os.path.join(directory, 'raw_tracks_large.csv')
+        write_large_tracks_file(tracks_csv_file, int(copies))
+        for scope, load in (('store', load_store), ('repository', load_repository)):
+            for track_store in TRACK_STORES:
+                tracks, allocated = measure(load, track_store, albums_csv_file, tracks_csv_file)
+                print(f'{scope:>10} {track_store:>8}: {allocated / tracks:7.0f} bytes/track for {tracks} tracks '
+                      f'({allocated / 2 ** 20:.1f} MiB)')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,105 @@
+"""Benchmark of building domain objects through the validating constructors versus from_trusted.
+
+Reads the full excerpt, then times three ways of building its tracks: create_track_object on the raw csv rows
+followed by linking the artist and genres (the reader's path), the constructor and property setters on values
+that are already typed, and Track.from_trusted on the same values. Albums, artists and genres are timed with
+their constructors against their from_trusted counterparts.
+
+    python -m benchmarks.bench_trusted_construction [repeats]
+"""
+import sys
+import time
+from pathlib import Path
+
+from music.adapters.csvdatareader import TrackCSVReader, create_track_object
+from music.domainmodel.album import Album
+from music.domainmodel.artist import Artist
+from music.domainmodel.genre import Genre
+from music.domainmodel.track import Track
+
+DATA_PATH = Path(__file__).parent.parent / 'music' / 'adapters' / 'data'
+
+
+def from_csv_rows(rows: list, tracks: list):
+    for row, parsed in zip(rows, tracks):
+        track = create_track_object(row)
+        track.artist = parsed.artist
+        for genre in parsed.genres:
+            track.add_genre(genre)
+
+
+def with_setters(values: list):
+    for track_id, title, artist, album, track_url, track_duration, genres in values:
+        track = Track(track_id, title)
+        track.artist = artist
+        track.album = album
+        track.track_url = track_url
+        if track_duration is not None:
+            track.track_duration = track_duration
+        for genre in genres:
+            track.add_genre(genre)
+
+
+def from_trusted(values: list):
+    for track_id, title, artist, album, track_url, track_duration, genres in values:
+        Track.from_trusted(track_id, title, artist, album, track_url, track_duration, genres)
+
+
+def with_album_setters(values: list):
+    for album_id, title, album_url, album_type, release_year in values:
+        album = Album(album_id, title)
+        album.album_url = album_url
+        album.album_type = album_type
+        album.release_year = release_year
+
+
+def albums_from_trusted(values: list):
+    for album_id, title, album_url, album_type, release_year in values:
+        Album.from_trusted(album_id, title, album_url, album_type, release_year)
+
+
+def best_time(build, *arguments, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        build(*arguments)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(name: str, count: int, timings: list):
+    baseline = timings[0][1]
+    for label, elapsed in timings:
+        print(f'{name:>7} {label:<22} {elapsed * 1e6 / count:6.2f} us each ({baseline / elapsed:4.1f}x)')
+
+
+def main(repeats: int = 20):
+    repeats = int(repeats)
+    reader = TrackCSVReader(str(DATA_PATH / 'raw_albums_excerpt.csv'), str(DATA_PATH / 'raw_tracks_excerpt.csv'))
+    rows = list(reader.iter_track_rows())
+    tracks = reader.read_csv_files()
+    values = [(track.track_id, track.title, track.artist, track.album, track.track_url, track.track_duration,
+               list(track.genres)) for track in tracks]
+    report('Track', len(tracks), [
+        ('create_track_object', best_time(from_csv_rows, rows, tracks, repeats=repeats)),
+        ('constructor+setters', best_time(with_setters, values, repeats=repeats)),
+        ('from_trusted', best_time(from_trusted, values, repeats=repeats)),
+    ])
+
+    album_values = [(album.album_id, album.title, album.album_url, album.album_type, album.release_year)
+                    for album in reader.dataset_of_albums]
+    report('Album', len(album_values), [
+        ('constructor+setters', best_time(with_album_setters, album_values, repeats=repeats)),
+        ('from_trusted', best_time(albums_from_trusted, album_values, repeats=repeats)),
+    ])
+    for cls, entities, fields in ((Artist, reader.dataset_of_artists, ('artist_id', 'full_name')),
+                                  (Genre, reader.dataset_of_genres, ('genre_id', 'name'))):
+        pairs = [tuple(getattr(entity, field) for field in fields) for entity in entities]
+        report(cls.__name__, len(pairs), [
+            ('constructor', best_time(lambda: [cls(*pair) for pair in pairs], repeats=repeats)),
+            ('from_trusted', best_time(lambda: [cls.from_trusted(*pair) for pair in pairs], repeats=repeats)),
+        ])
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -17,10 +17,36 @@ class Config:
 
     TESTING = environ.get('TESTING')
     REPOSITORY = environ.get('REPOSITORY')
+    # Number of processes parsing the tracks csv file when the memory repository is populated.
+    INGEST_PROCESSES = int(environ.get('INGEST_PROCESSES', 1))
+    # Opt-in snapshot of the parsed catalogue, written next to the tracks csv file and reused while it is unchanged.
+    CATALOGUE_CACHE = environ.get('CATALOGUE_CACHE', 'False').lower().strip() == "true"
+    # How the memory repository holds tracks: objects (Track instances) or columnar (compact arrays).
+    MEMORY_TRACK_STORE = environ.get('MEMORY_TRACK_STORE', 'objects')
         # Database configuration
     SQLALCHEMY_DATABASE_URI = environ.get('SQLALCHEMY_DATABASE_URI')
 
+    # How the database repository loads the artist, album and genres of listed tracks: selectin, joined or lazy.
+    SQLALCHEMY_TRACK_LOADING = environ.get('SQLALCHEMY_TRACK_LOADING', 'selectin')
+
     echo_string = environ.get('SQLALCHEMY_ECHO')
     SQLALCHEMY_ECHO = False
     if echo_string.lower().strip() == "true":
         SQLALCHEMY_ECHO = True
+
+    # Connection pool of the database engine: null (a connection per session) or queue (reused connections).
+    SQLALCHEMY_POOL = environ.get('SQLALCHEMY_POOL', 'null')
+    SQLALCHEMY_POOL_SIZE = int(environ.get('SQLALCHEMY_POOL_SIZE', 5))
+    SQLALCHEMY_MAX_OVERFLOW = int(environ.get('SQLALCHEMY_MAX_OVERFLOW', 10))
+    SQLALCHEMY_POOL_PRE_PING = environ.get('SQLALCHEMY_POOL_PRE_PING', 'True').lower().strip() == "true"
+
+    # Opt-in SQLite tuning: WAL journaling, synchronous=NORMAL, in-memory temp store and the cache and mmap sizes
+    # below (cache in KiB when negative, mmap in bytes).
+    SQLITE_PERFORMANCE_PROFILE = environ.get('SQLITE_PERFORMANCE_PROFILE', 'False').lower().strip() == "true"
+    SQLITE_CACHE_SIZE = int(environ.get('SQLITE_CACHE_SIZE', -64000))
+    SQLITE_MMAP_SIZE = int(environ.get('SQLITE_MMAP_SIZE', 268435456))
+
+    # Opt-in read-through cache of repository counts and catalogue listings, bounded in entries and age (seconds).
+    CACHE_REPOSITORY = environ.get('CACHE_REPOSITORY', 'False').lower().strip() == "true"
+    CACHE_MAX_ENTRIES = int(environ.get('CACHE_MAX_ENTRIES', 1024))
+    CACHE_TTL = float(environ.get('CACHE_TTL', 60))
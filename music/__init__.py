@@ -7,11 +7,10 @@ from pathlib import Path
 import music.adapters.repository as repo
 from music.adapters.memory_repository import MemoryRepository, populate
 # imports from SQLAlchemy
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, clear_mappers
-from sqlalchemy.pool import NullPool
 from music.adapters import database_repository, repository_populate
-from music.adapters.orm import metadata, map_model_to_tables
+from music.adapters.caching_repository import CachingRepository, unwrap_repository
+from music.adapters.orm import metadata, map_model_to_tables, upgrade_schema
 
 def create_app(test_config=None):
     app = Flask(__name__)
@@ -22,8 +21,9 @@ def create_app(test_config=None):
     # data_path = Path('tests') / 'data'
 
     if app.config['REPOSITORY'] == 'memory':
-        repo.repo_instance = MemoryRepository()
-        populate(data_path, repo.repo_instance)
+        repo.repo_instance = MemoryRepository(track_store=app.config['MEMORY_TRACK_STORE'])
+        populate(data_path, repo.repo_instance, use_cache=app.config['CATALOGUE_CACHE'],
+                 processes=app.config['INGEST_PROCESSES'])
 
     elif app.config['REPOSITORY'] == 'database':
         # Configure database.
@@ -34,14 +34,20 @@ def create_app(test_config=None):
         # leading to a URI of "sqlite:///covid-19.db".
         # Note that create_engine does not establish any actual DB connection directly!
         database_echo = app.config['SQLALCHEMY_ECHO']
-        # Please do not change the settings for connect_args and poolclass!
-        database_engine = create_engine(database_uri, connect_args={"check_same_thread": False}, poolclass=NullPool,
-                                        echo=database_echo)
+        # Connections are opened per session unless SQLALCHEMY_POOL selects a pool of reused connections.
+        database_engine = database_repository.create_database_engine(
+            database_uri, echo=database_echo, pool=app.config['SQLALCHEMY_POOL'],
+            pool_size=app.config['SQLALCHEMY_POOL_SIZE'], max_overflow=app.config['SQLALCHEMY_MAX_OVERFLOW'],
+            pool_pre_ping=app.config['SQLALCHEMY_POOL_PRE_PING'])
+        if app.config['SQLITE_PERFORMANCE_PROFILE']:
+            database_repository.enable_sqlite_performance_profile(
+                database_engine, cache_size=app.config['SQLITE_CACHE_SIZE'], mmap_size=app.config['SQLITE_MMAP_SIZE'])
 
         # Create the database session factory using sessionmaker (this has to be done once, in a global manner)
         session_factory = sessionmaker(autocommit=False, autoflush=True, bind=database_engine)
         # Create the SQLAlchemy DatabaseRepository instance for an sqlite3-based repository.
-        repo.repo_instance = database_repository.SqlAlchemyRepository(session_factory)
+        repo.repo_instance = database_repository.SqlAlchemyRepository(
+            session_factory, track_loading=app.config['SQLALCHEMY_TRACK_LOADING'])
 
 
         if app.config['TESTING'] == 'True' or len(database_engine.table_names()) == 0:
@@ -49,6 +55,7 @@ def create_app(test_config=None):
             # For testing, or first-time use of the web application, reinitialise the database.
             clear_mappers()
             metadata.create_all(database_engine)  # Conditionally create database tables.
+            upgrade_schema(database_engine)  # Bring tables created by an earlier revision up to date.
             for table in reversed(metadata.sorted_tables):  # Remove any data from the tables.
                 database_engine.execute(table.delete())
 
@@ -56,11 +63,12 @@ def create_app(test_config=None):
             map_model_to_tables()
 
             test_mode = False
-            repository_populate.populate(data_path, repo.repo_instance, test_mode)
+            repository_populate.populate(data_path, repo.repo_instance, test_mode, bulk=True)
             print("REPOPULATING DATABASE... FINISHED")
 
         else:
-            # Solely generate mappings that map domain model classes to the database tables.
+            # Bring the tables up to the current revision and generate the mappings.
+            upgrade_schema(database_engine)
             map_model_to_tables()
 
 
@@ -69,7 +77,9 @@ def create_app(test_config=None):
         app.config.from_mapping(test_config)
         data_path = app.config['TEST_DATA_PATH']
 
-
+    if app.config['CACHE_REPOSITORY']:
+        repo.repo_instance = CachingRepository(
+            repo.repo_instance, max_entries=app.config['CACHE_MAX_ENTRIES'], ttl=app.config['CACHE_TTL'])
 
     with app.app_context():
         from .tracks import tracks
@@ -85,13 +95,15 @@ def create_app(test_config=None):
         # We reset the session inside the database repository before a new flask request is generated
     @app.before_request
     def before_flask_http_request_function():
-        if isinstance(repo.repo_instance, database_repository.SqlAlchemyRepository):
-            repo.repo_instance.reset_session()
+        repository = unwrap_repository(repo.repo_instance)
+        if isinstance(repository, database_repository.SqlAlchemyRepository):
+            repository.reset_session()
 
         # Register a tear-down method that will be called after each request has been processed.
     @app.teardown_appcontext
     def shutdown_session(exception=None):
-        if isinstance(repo.repo_instance, database_repository.SqlAlchemyRepository):
-            repo.repo_instance.close_session()
+        repository = unwrap_repository(repo.repo_instance)
+        if isinstance(repository, database_repository.SqlAlchemyRepository):
+            repository.close_session()
 
     return app
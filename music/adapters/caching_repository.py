@@ -0,0 +1,258 @@
+import time
+from collections import OrderedDict, namedtuple
+from threading import Lock
+from typing import List
+
+from music.adapters.repository import AbstractRepository
+
+from music.domainmodel.artist import Artist
+from music.domainmodel.album import Album
+from music.domainmodel.track import Track
+from music.domainmodel.genre import Genre
+from music.domainmodel.user import User
+from music.domainmodel.review import Review
+from music.domainmodel.playlist import PlayList
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'max_entries', 'entries'])
+
+# Tags of the cached reads a write invalidates.
+TRACKS = 'tracks'
+ARTISTS = 'artists'
+ALBUMS = 'albums'
+GENRES = 'genres'
+PLAYLISTS = 'playlists'
+
+
+def reviews_tag(track: Track):
+    return 'reviews', track.track_id if track is not None else None
+
+
+class CachingRepository(AbstractRepository):
+    """ Read-through cache in front of another repository.
+
+    Counts, catalogue listings, track pages, search results and the tracks of an artist are memoized in a least
+    recently used cache holding at most max_entries results for at most ttl seconds each. Every write is passed
+    on and then drops the cached results it may have changed; a read that overlapped such a write is returned
+    but not cached. Cached results are shared between requests, so with a database repository they hold
+    instances of earlier, closed sessions: their artist, album and genres are loaded eagerly and can be read,
+    but they must not be handed to writes. Single tracks, users, playlists and reviews, which views do hand to
+    writes, are read through uncached. Attributes outside the AbstractRepository interface are looked up on the
+    wrapped repository.
+    """
+
+    def __init__(self, repository: AbstractRepository, max_entries: int = 1024, ttl: float = 60.0,
+                 clock=time.monotonic):
+        if max_entries < 1 or ttl <= 0:
+            raise ValueError('max_entries and ttl should be positive')
+        self.__repository = repository
+        self.__max_entries = max_entries
+        self.__ttl = ttl
+        self.__clock = clock
+        # key -> (expiry time, result, tags), least recently used first
+        self.__entries = OrderedDict()
+        self.__keys_by_tag = dict()
+        # Bumped by every invalidation of a tag, and by clear for all of them, so that a read overlapping a
+        # write can tell its result may be stale.
+        self.__generations = dict()
+        self.__epoch = 0
+        self.__lock = Lock()
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def repository(self) -> AbstractRepository:
+        return self.__repository
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.__hits, self.__misses, self.__max_entries, len(self.__entries))
+
+    def __getattr__(self, name):
+        if name.startswith('_CachingRepository__'):
+            raise AttributeError(name)
+        return getattr(self.__repository, name)
+
+    def __cached(self, tags: tuple, read, *args):
+        key = (read.__name__,) + args
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] > self.__clock():
+                self.__entries.move_to_end(key)
+                self.__hits += 1
+                return entry[1]
+            self.__misses += 1
+            generations = self.__tag_generations(tags)
+
+        result = read(*args)
+        with self.__lock:
+            if self.__tag_generations(tags) != generations:
+                return result
+            self.__drop(key)
+            self.__entries[key] = (self.__clock() + self.__ttl, result, tags)
+            for tag in tags:
+                self.__keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self.__entries) > self.__max_entries:
+                self.__drop(next(iter(self.__entries)))
+        return result
+
+    def __tag_generations(self, tags: tuple) -> tuple:
+        return (self.__epoch,) + tuple(self.__generations.get(tag, 0) for tag in tags)
+
+    def __drop(self, key):
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            for tag in entry[2]:
+                keys = self.__keys_by_tag.get(tag)
+                keys.discard(key)
+                if not keys:
+                    del self.__keys_by_tag[tag]
+
+    def invalidate(self, *tags):
+        """ Drops the cached results carrying any of the tags. """
+        with self.__lock:
+            for tag in tags:
+                self.__generations[tag] = self.__generations.get(tag, 0) + 1
+                for key in list(self.__keys_by_tag.get(tag, ())):
+                    self.__drop(key)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__keys_by_tag.clear()
+            self.__generations.clear()
+            self.__epoch += 1
+
+    def add_user(self, user: User):
+        self.__repository.add_user(user)
+
+    def get_user(self, user_name) -> User:
+        return self.__repository.get_user(user_name)
+
+    def add_track(self, track: Track):
+        self.__repository.add_track(track)
+        # Adding a track may also add its artist, album and genres.
+        self.invalidate(TRACKS, ARTISTS, ALBUMS, GENRES)
+
+    def get_track(self, id: int) -> Track:
+        return self.__repository.get_track(id)
+
+    def get_tracks_by_ids(self, track_ids: List[int]) -> list:
+        return self.__repository.get_tracks_by_ids(track_ids)
+
+    def get_tracks(self) -> list:
+        return self.__repository.get_tracks()
+
+    def sample_tracks(self, k: int) -> list:
+        return self.__repository.sample_tracks(k)
+
+    def get_tracks_page(self, offset: int, limit: int) -> list:
+        return self.__cached((TRACKS,), self.__repository.get_tracks_page, offset, limit)
+
+    def get_tracks_keyset_page(self, limit: int, after: int = None, before: int = None) -> list:
+        return self.__cached((TRACKS,), self.__repository.get_tracks_keyset_page, limit, after, before)
+
+    def get_number_of_tracks(self) -> int:
+        return self.__cached((TRACKS,), self.__repository.get_number_of_tracks)
+
+    def get_tracks_by_artist(self, artist: Artist) -> list:
+        return self.__cached((TRACKS,), self.__repository.get_tracks_by_artist, artist)
+
+    def search_tracks(self, input: str) -> list:
+        return self.__cached((TRACKS,), self.__repository.search_tracks, input)
+
+    def add_artist(self, artist: Artist):
+        self.__repository.add_artist(artist)
+        self.invalidate(ARTISTS)
+
+    def get_artists(self) -> Artist:
+        return self.__cached((ARTISTS,), self.__repository.get_artists)
+
+    def get_artists_page(self, offset: int, limit: int) -> list:
+        return self.__cached((ARTISTS,), self.__repository.get_artists_page, offset, limit)
+
+    def get_artists_keyset_page(self, limit: int, after: int = None, before: int = None) -> list:
+        return self.__cached((ARTISTS,), self.__repository.get_artists_keyset_page, limit, after, before)
+
+    def add_genre(self, genre: Genre):
+        self.__repository.add_genre(genre)
+        self.invalidate(GENRES)
+
+    def get_genres(self) -> Genre:
+        return self.__cached((GENRES,), self.__repository.get_genres)
+
+    def get_genres_page(self, offset: int, limit: int) -> list:
+        return self.__cached((GENRES,), self.__repository.get_genres_page, offset, limit)
+
+    def get_genres_keyset_page(self, limit: int, after: int = None, before: int = None) -> list:
+        return self.__cached((GENRES,), self.__repository.get_genres_keyset_page, limit, after, before)
+
+    def get_number_of_genres(self):
+        return self.__cached((GENRES,), self.__repository.get_number_of_genres)
+
+    def add_album(self, album: Album):
+        self.__repository.add_album(album)
+        self.invalidate(ALBUMS)
+
+    def get_albums(self):
+        return self.__cached((ALBUMS,), self.__repository.get_albums)
+
+    def get_albums_page(self, offset: int, limit: int) -> list:
+        return self.__cached((ALBUMS,), self.__repository.get_albums_page, offset, limit)
+
+    def get_albums_keyset_page(self, limit: int, after: int = None, before: int = None) -> list:
+        return self.__cached((ALBUMS,), self.__repository.get_albums_keyset_page, limit, after, before)
+
+    def get_number_of_albums(self):
+        return self.__cached((ALBUMS,), self.__repository.get_number_of_albums)
+
+    def add_review(self, review: Review):
+        self.__repository.add_review(review)
+        self.invalidate(reviews_tag(review.track))
+
+    def get_reviews(self, track: Track):
+        return self.__repository.get_reviews(track)
+
+    def get_reviews_page(self, track: Track, offset: int, limit: int = None) -> list:
+        return self.__repository.get_reviews_page(track, offset, limit)
+
+    def get_number_of_reviews(self, track: Track) -> int:
+        return self.__cached((reviews_tag(track),), self.__repository.get_number_of_reviews, track)
+
+    def add_playlist(self, playlist: PlayList):
+        self.__repository.add_playlist(playlist)
+        self.invalidate(PLAYLISTS)
+
+    def get_playlist(self, playlist_id: int):
+        return self.__repository.get_playlist(playlist_id)
+
+    def get_playlist_by_name(self, name: str):
+        return self.__repository.get_playlist_by_name(name)
+
+    def get_playlists(self):
+        return self.__repository.get_playlists()
+
+    def get_number_of_playlists(self):
+        return self.__cached((PLAYLISTS,), self.__repository.get_number_of_playlists)
+
+    def add_track_to_playlist(self, playlist_id: int, track_id: int):
+        self.__repository.add_track_to_playlist(playlist_id, track_id)
+        self.invalidate(PLAYLISTS)
+
+    def create_random_playlist(self, length: int):
+        playlist = self.__repository.create_random_playlist(length)
+        self.invalidate(PLAYLISTS)
+        return playlist
+
+
+def unwrap_repository(repository: AbstractRepository) -> AbstractRepository:
+    """ Returns the repository behind any caching layers. """
+    while isinstance(repository, CachingRepository):
+        repository = repository.repository
+    return repository
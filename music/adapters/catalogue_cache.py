@@ -0,0 +1,81 @@
+import os
+import pickle
+import hashlib
+import tempfile
+from pathlib import Path
+
+from music.adapters.csvdatareader import TrackCSVReader
+
+# Bump whenever the pickled domain model changes shape, so stale snapshots are ignored.
+CACHE_FORMAT_VERSION = 5
+
+
+def file_fingerprint(filename: str) -> tuple:
+    stat = os.stat(filename)
+    sha256 = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(block)
+    return stat.st_size, stat.st_mtime_ns, sha256.hexdigest()
+
+
+def cache_filename(tracks_csv_file: str) -> Path:
+    return Path(tracks_csv_file).with_suffix('.catalogue.pickle')
+
+
+def read_catalogue_cache(cache_file: Path, key: tuple):
+    try:
+        with open(cache_file, 'rb') as f:
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f'Ignoring unreadable catalogue cache {cache_file}: {e}')
+        return None
+
+    if not isinstance(snapshot, dict) or snapshot.get('key') != key:
+        return None
+    return snapshot['catalogue']
+
+
+def write_catalogue_cache(cache_file: Path, key: tuple, catalogue: tuple):
+    temporary_file = None
+    try:
+        # Each writer gets its own temporary file in the cache directory, so workers starting together never
+        # write into the same file, and the atomic replace means none of them reads a half written snapshot.
+        descriptor, temporary_file = tempfile.mkstemp(prefix=cache_file.name + '.', suffix='.tmp',
+                                                      dir=cache_file.parent)
+        with os.fdopen(descriptor, 'wb') as f:
+            pickle.dump({'key': key, 'catalogue': catalogue}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_file, cache_file)
+    except Exception as e:
+        print(f'Could not write catalogue cache {cache_file}: {e}')
+        if temporary_file is not None and os.path.exists(temporary_file):
+            os.unlink(temporary_file)
+
+
+def load_catalogue(albums_csv_file: str, tracks_csv_file: str, use_cache: bool = True, processes: int = 1) -> tuple:
+    """ Returns (tracks, artists, albums, genres) parsed from the CSV files.
+
+    When use_cache is set, the parsed catalogue is snapshotted next to the tracks file, keyed by the size,
+    modification time and SHA-256 hash of both CSV files, and later calls load the snapshot instead of parsing.
+    With more than one process the tracks file is parsed in parallel chunks.
+    """
+    if use_cache:
+        key = (CACHE_FORMAT_VERSION, file_fingerprint(albums_csv_file), file_fingerprint(tracks_csv_file))
+        cache_file = cache_filename(tracks_csv_file)
+        catalogue = read_catalogue_cache(cache_file, key)
+        if catalogue is not None:
+            return catalogue
+
+    csvreader = TrackCSVReader(albums_csv_file, tracks_csv_file)
+    if processes > 1:
+        csvreader.read_csv_files_parallel(processes)
+    else:
+        csvreader.read_csv_files()
+    catalogue = (csvreader.dataset_of_tracks, csvreader.dataset_of_artists,
+                 csvreader.dataset_of_albums, csvreader.dataset_of_genres)
+
+    if use_cache:
+        write_catalogue_cache(cache_file, key, catalogue)
+    return catalogue
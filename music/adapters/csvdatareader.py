@@ -1,6 +1,10 @@
+import io
 import os
+import re
 import csv
 import ast
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
 
 from music.domainmodel.artist import Artist
 from music.domainmodel.album import Album
@@ -8,20 +12,31 @@ from music.domainmodel.track import Track
 from music.domainmodel.genre import Genre
 
 
-def create_track_object(track_row):
-    track = Track(int(track_row['track_id']), track_row['track_title'])
-    track.track_url = track_row['track_url']
-    track_duration = round(float(
-        track_row['track_duration'])) if track_row['track_duration'] is not None else None
+# The only columns of the tracks file that are turned into domain objects, in the order iter_tracks reads them.
+TRACK_COLUMNS = ('track_id', 'track_title', 'track_url', 'track_duration',
+                 'artist_id', 'artist_name', 'album_id', 'track_genres')
+
+
+def build_track(track_id: str, track_title: str, track_url: str, track_duration: str):
+    track = Track(int(track_id), track_title)
+    track.track_url = track_url
+    track_duration = round(float(track_duration)) if track_duration is not None else None
     if type(track_duration) is int:
         track.track_duration = track_duration
     return track
 
 
+def build_artist(artist_id: str, artist_name: str):
+    return Artist(int(artist_id), artist_name)
+
+
+def create_track_object(track_row):
+    return build_track(track_row['track_id'], track_row['track_title'], track_row['track_url'],
+                       track_row['track_duration'])
+
+
 def create_artist_object(track_row):
-    artist_id = int(track_row['artist_id'])
-    artist = Artist(artist_id, track_row['artist_name'])
-    return artist
+    return build_artist(track_row['artist_id'], track_row['artist_name'])
 
 
 def create_album_object(row):
@@ -36,27 +51,165 @@ def create_album_object(row):
     return album
 
 
-def extract_genres(track_row: dict):
-    # List of dictionaries inside the string.
-    track_genres_raw = track_row['track_genres']
-    # Populate genres. track_genres can be empty (None)
-    genres = []
-    if track_genres_raw:
-        try:
-            genre_dicts = ast.literal_eval(
-                track_genres_raw) if track_genres_raw != "" else []
-
-            for genre_dict in genre_dicts:
-                genre = Genre(
-                    int(genre_dict['genre_id']), genre_dict['genre_title'])
-                genres.append(genre)
-        except Exception as e:
-            print(track_genres_raw)
-            print(f'Exception occurred while parsing genres: {e}')
+# One entry of the track_genres column as written by the FMA export, e.g.
+# {'genre_id': '21', 'genre_title': 'Hip-Hop', 'genre_url': 'http://freemusicarchive.org/genre/Hip-Hop/'}
+_GENRE_ENTRY = r"\{'genre_id': '(\d+)', 'genre_title': '([^'\\]*)', 'genre_url': '[^'\\]*'\}"
+_GENRE_ENTRY_PATTERN = re.compile(_GENRE_ENTRY)
+_GENRE_LIST_PATTERN = re.compile(r"\[(?:" + _GENRE_ENTRY + r"(?:, " + _GENRE_ENTRY + r")*)?\]")
+
+
+def parse_genre_list(track_genres_raw: str) -> list:
+    """ Returns the (genre_id, genre_title) pairs of a track_genres value in the exported format.
+
+    Returns None when the value deviates from that format (e.g. a title quoted with double quotes because it
+    contains an apostrophe), so the caller can fall back to literal_eval_genres.
+    """
+    if _GENRE_LIST_PATTERN.fullmatch(track_genres_raw) is None:
+        return None
+    return [(int(genre_id), genre_title) for genre_id, genre_title in _GENRE_ENTRY_PATTERN.findall(track_genres_raw)]
+
+
+def literal_eval_genres(track_genres_raw: str) -> list:
+    genre_dicts = ast.literal_eval(track_genres_raw)
+    return [(int(genre_dict['genre_id']), genre_dict['genre_title']) for genre_dict in genre_dicts]
 
+
+def extract_genres(track_row: dict, genres_by_id: dict = None):
+    return build_genres(track_row['track_genres'], genres_by_id)
+
+
+def parse_genres(track_genres_raw: str) -> list:
+    # track_genres_raw is a list of dictionaries inside the string; returns its (genre_id, genre_title) pairs.
+    # track_genres can be empty (None)
+    if not track_genres_raw:
+        return []
+    try:
+        genre_pairs = parse_genre_list(track_genres_raw)
+        if genre_pairs is None:
+            genre_pairs = literal_eval_genres(track_genres_raw)
+        return genre_pairs
+    except Exception as e:
+        print(track_genres_raw)
+        print(f'Exception occurred while parsing genres: {e}')
+        return []
+
+
+def genres_from_pairs(genre_pairs: list, genres_by_id: dict = None):
+    genres = []
+    for genre_id, genre_title in genre_pairs:
+        # Intern genres by id when a map is given, so every track shares one Genre per genre id.
+        genre = genres_by_id.get(genre_id) if genres_by_id is not None else None
+        if genre is None:
+            genre = Genre(genre_id, genre_title)
+            if genres_by_id is not None:
+                genres_by_id[genre_id] = genre
+        genres.append(genre)
     return genres
 
 
+def build_genres(track_genres_raw: str, genres_by_id: dict = None):
+    return genres_from_pairs(parse_genres(track_genres_raw), genres_by_id)
+
+
+def project_rows(reader, header: list, columns: tuple = TRACK_COLUMNS):
+    """ Yields a tuple holding only the given columns for each row produced by a csv.reader over the tracks. """
+    positions = [header.index(column) for column in columns]
+    project = itemgetter(*positions) if len(positions) > 1 else lambda row: (row[positions[0]],)
+    for row in reader:
+        # Skip blank lines and pad short rows with None, as csv.DictReader does.
+        if not row:
+            continue
+        if len(row) < len(header):
+            row += [None] * (len(header) - len(row))
+        yield project(row)
+
+
+def build_track_from_fields(fields: tuple, genre_pairs: list, genres_by_id: dict, artists_by_id: dict = None):
+    """ Builds the Track of a row projected on TRACK_COLUMNS, linked to its artist and genres.
+
+    genre_pairs are the parsed track_genres of the row. Artists and genres are interned in the given id-keyed
+    maps. Returns the track together with the row's album id, as albums are looked up by the caller.
+    """
+    track_id, track_title, track_url, track_duration, artist_id, artist_name, album_id = fields[:7]
+    track = build_track(track_id, track_title, track_url, track_duration)
+    artist = artists_by_id.get(int(artist_id)) if artists_by_id is not None else None
+    if artist is None:
+        artist = build_artist(artist_id, artist_name)
+        if artists_by_id is not None:
+            artists_by_id[artist.artist_id] = artist
+    track.artist = artist
+
+    # Assign the track_genres attributes to the track.
+    for genre in genres_from_pairs(genre_pairs, genres_by_id):
+        track.add_genre(genre)
+
+    album_id = int(album_id) if album_id.isdigit() else None
+    return track, album_id
+
+
+def add_back_references(track: Track):
+    # With the ORM mappings configured, assigning track.artist and track.album has already appended the track
+    # through the relationship backrefs, so only append when the track is not the latest one.
+    for owner in (track.artist, track.album):
+        if owner is not None and (not owner.tracks or owner.tracks[-1] is not track):
+            owner.add_track(track)
+
+
+def is_escaped(data: bytes, position: int) -> bool:
+    backslashes = 0
+    while position - backslashes > 0 and data[position - backslashes - 1] == ord('\\'):
+        backslashes += 1
+    return backslashes % 2 == 1
+
+
+def record_end(data: bytes, start: int, position: int) -> int:
+    """ Returns the offset just past the first newline at or after position that ends a csv record.
+
+    start must be the offset of a record start. A newline only ends a record when the quotes since start are
+    balanced, since quoted fields may span several lines, and when no backslash escapes it.
+    """
+    newline = data.find(b'\n', position)
+    quotes = data.count(b'"', start, newline) if newline != -1 else 0
+    while newline != -1 and (quotes % 2 or is_escaped(data, newline)):
+        next_newline = data.find(b'\n', newline + 1)
+        if next_newline != -1:
+            quotes += data.count(b'"', newline, next_newline)
+        newline = next_newline
+    return len(data) if newline == -1 else newline + 1
+
+
+def split_records(data: bytes, start: int, number_of_chunks: int) -> list:
+    """ Splits data[start:] into about number_of_chunks (start, end) byte ranges, each holding whole records. """
+    chunk_size = max(1, (len(data) - start) // number_of_chunks)
+    byte_ranges = []
+    while start < len(data):
+        end = record_end(data, start, start + chunk_size)
+        byte_ranges.append((start, end))
+        start = end
+    return byte_ranges
+
+
+def decode_tracks_bytes(data: bytes) -> str:
+    # Decodes like open(..., encoding='unicode_escape') in text mode, including its universal newlines.
+    return data.decode('unicode_escape').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def parse_track_chunk(chunk: tuple):
+    """ Runs in a worker process: reads, decodes and parses one byte range of the tracks file.
+
+    Returns the projected fields and parsed genre pairs of every row, or None when the decoded chunk does not
+    hold whole records, which happens if escape sequences decode to quotes.
+    """
+    tracks_csv_file, header, start, end = chunk
+    with open(tracks_csv_file, 'rb') as track_csv:
+        track_csv.seek(start)
+        text = decode_tracks_bytes(track_csv.read(end - start))
+    if text.count('"') % 2:
+        return None
+    reader = csv.reader(io.StringIO(text))
+    return [(fields[:7], parse_genres(fields[7])) for fields in project_rows(reader, header)]
+
+
 class TrackCSVReader:
 
     def __init__(self, albums_csv_file: str, tracks_csv_file: str):
@@ -78,6 +231,9 @@ class TrackCSVReader:
         self.__dataset_of_albums = set()
         # Set of unique genres
         self.__dataset_of_genres = set()
+        # Artists and genres interned by id while reading tracks
+        self.__artists_by_id = dict()
+        self.__genres_by_id = dict()
 
     @property
     def dataset_of_tracks(self) -> list:
@@ -115,54 +271,117 @@ class TrackCSVReader:
 
         return album_dict
 
-    def read_tracks_file(self):
+    def iter_track_rows(self):
         if not os.path.exists(self.__tracks_csv_file):
             print(f"path {self.__tracks_csv_file} does not exist!")
             return
-        track_rows = []
         # encoding of unicode_escape is required to decode successfully
         with open(self.__tracks_csv_file, encoding='unicode_escape') as track_csv:
             reader = csv.DictReader(track_csv)
             for track_row in reader:
-                track_rows.append(track_row)
-        return track_rows
+                yield track_row
 
-    def read_csv_files(self):
-        # key is album_id
-        albums_dict: dict = self.read_albums_file_as_dict()
-        # list of track csv rows, not track objects
-        track_rows: list = self.read_tracks_file()
-
-        # Make sure re-initialize to empty list, so that calling this function multiple times does not create
-        # duplicated dataset.
-        self.__dataset_of_tracks = []
-        for track_row in track_rows:
-            track = create_track_object(track_row)
-            artist = create_artist_object(track_row)
-            track.artist = artist
+    def read_tracks_file(self):
+        if not os.path.exists(self.__tracks_csv_file):
+            print(f"path {self.__tracks_csv_file} does not exist!")
+            return
+        return list(self.iter_track_rows())
 
-            # Extract track_genres attributes and assign genres to the track.
-            track_genres = extract_genres(track_row)
-            for genre in track_genres:
-                track.add_genre(genre)
+    def iter_projected_track_rows(self, columns: tuple = TRACK_COLUMNS):
+        """ Yields a tuple holding only the given columns for each row of the tracks file.
 
-            album_id = int(
-                track_row['album_id']) if track_row['album_id'].isdigit() else None
+        Header positions are resolved once, and rows are read as plain lists instead of a dict per row.
+        """
+        if not os.path.exists(self.__tracks_csv_file):
+            print(f"path {self.__tracks_csv_file} does not exist!")
+            return
+        # encoding of unicode_escape is required to decode successfully
+        with open(self.__tracks_csv_file, encoding='unicode_escape') as track_csv:
+            reader = csv.reader(track_csv)
+            header = next(reader, None)
+            if header is None:
+                return
+            yield from project_rows(reader, header, columns)
+
+    def iter_tracks(self):
+        """ Yields fully linked Track objects one csv row at a time, without holding the rows in memory.
+
+        The artist, album and genre datasets are filled in as the tracks are yielded, so they are only complete
+        once the generator is exhausted. Artist.tracks and Album.tracks are left alone, as filling them would keep
+        every yielded track alive; read_csv_files fills them.
+        """
+        # key is album_id
+        albums_dict: dict = self.read_albums_file_as_dict()
 
+        for fields in self.iter_projected_track_rows():
+            track, album_id = build_track_from_fields(fields, parse_genres(fields[7]), self.__genres_by_id,
+                                                      self.__artists_by_id)
             album = albums_dict[album_id] if album_id in albums_dict else None
             track.album = album
+            self.__add_to_datasets(track)
+            yield track
 
-            # Populate datasets for Artist and Genre
-            if artist not in self.__dataset_of_artists:
-                self.__dataset_of_artists.add(artist)
+    def __add_to_datasets(self, track: Track):
+        # Populate datasets for Artist, Album and Genre
+        if track.artist not in self.__dataset_of_artists:
+            self.__dataset_of_artists.add(track.artist)
 
-            if album is not None and album not in self.__dataset_of_albums:
-                self.__dataset_of_albums.add(album)
+        if track.album is not None and track.album not in self.__dataset_of_albums:
+            self.__dataset_of_albums.add(track.album)
 
-            for genre in track_genres:
-                if genre not in self.__dataset_of_genres:
-                    self.__dataset_of_genres.add(genre)
+        for genre in track.genres:
+            if genre not in self.__dataset_of_genres:
+                self.__dataset_of_genres.add(genre)
 
+    def read_csv_files(self):
+        # Make sure re-initialize to empty list, so that calling this function multiple times does not create
+        # duplicated dataset.
+        self.__dataset_of_tracks = []
+        for track in self.iter_tracks():
+            add_back_references(track)
             self.__dataset_of_tracks.append(track)
 
         return self.__dataset_of_tracks
+
+    def read_csv_files_parallel(self, processes: int = None, chunks_per_process: int = 4):
+        """ Reads the csv files like read_csv_files, parsing chunks of the tracks file in a process pool.
+
+        The tracks file is split into byte ranges aligned to record boundaries. Workers decode and parse them
+        into plain fields, and the tracks are built from those in file order, so the datasets are identical to
+        those of the serial reader.
+        """
+        self.__dataset_of_tracks = []
+        if not os.path.exists(self.__tracks_csv_file):
+            print(f"path {self.__tracks_csv_file} does not exist!")
+            return self.__dataset_of_tracks
+
+        with open(self.__tracks_csv_file, 'rb') as track_csv:
+            data = track_csv.read()
+        header_end = record_end(data, 0, 0)
+        header = next(csv.reader(io.StringIO(decode_tracks_bytes(data[:header_end]))), None)
+        if header is None:
+            return self.__dataset_of_tracks
+        processes = processes or os.cpu_count() or 1
+        byte_ranges = split_records(data, header_end, processes * chunks_per_process)
+        del data
+
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            chunks = list(executor.map(parse_track_chunk, [
+                (self.__tracks_csv_file, header, start, end) for start, end in byte_ranges
+            ]))
+        if any(chunk is None for chunk in chunks):
+            print('Tracks file cannot be split into chunks, reading it serially')
+            return self.read_csv_files()
+
+        # key is album_id
+        albums_dict: dict = self.read_albums_file_as_dict()
+        for chunk in chunks:
+            for fields, genre_pairs in chunk:
+                track, album_id = build_track_from_fields(fields, genre_pairs, self.__genres_by_id,
+                                                          self.__artists_by_id)
+                track.album = albums_dict[album_id] if album_id in albums_dict else None
+                add_back_references(track)
+                self.__add_to_datasets(track)
+                self.__dataset_of_tracks.append(track)
+
+        return self.__dataset_of_tracks
@@ -1,14 +1,20 @@
 import random
+import time
 from datetime import date
-from typing import List
+from typing import List, Iterable
 from pathlib import Path
-from sqlalchemy import desc, asc, select
+from sqlalchemy import create_engine, event, desc, asc, select, text, or_, func
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.orm.exc import NoResultFound, MultipleResultsFound
 
-from sqlalchemy.orm import scoped_session
+from sqlalchemy.orm import scoped_session, selectinload, joinedload
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
 
 from music.adapters.csvdatareader import TrackCSVReader
-from music.adapters.repository import AbstractRepository, RepositoryException
+from music.adapters.repository import AbstractRepository, RepositoryException, normalize_playlist_name
+from music.adapters import orm
+from music.adapters.orm import track_search
+from music.adapters.search_index import track_matches
 
 from music.domainmodel.artist import Artist
 from music.domainmodel.album import Album
@@ -18,6 +24,74 @@ from music.domainmodel.user import User
 from music.domainmodel.review import Review
 from music.domainmodel.playlist import PlayList
 
+# Rebuilds the track_search rows of all tracks, or of a single track when filtered on t.track_id.
+SEARCH_INDEX_INSERT = (
+    "INSERT INTO track_search (rowid, title, artist_name, album_title, genre_names) "
+    "SELECT t.track_id, t.title, "
+    "(SELECT a.full_name FROM artists a WHERE a.artist_id = t.artist_id), "
+    "(SELECT al.title FROM albums al WHERE al.album_id = t.album_id), "
+    "(SELECT group_concat(g.genre_name, char(31)) FROM track_genre tg "
+    "JOIN genres g ON g.genre_id = tg.genre_id WHERE tg.track_id = t.track_id) "
+    "FROM tracks t"
+)
+
+# Older SQLite builds bind at most 999 parameters per statement.
+TRACK_ID_BATCH_SIZE = 900
+
+# Rounds of drawing random ids between the smallest and largest track id before sample_tracks falls back to
+# ORDER BY random(), which scans the whole table.
+SAMPLE_ROUNDS = 4
+
+# Loaders for the (artist and album, genres and playlist tracks) of listed tracks. 'lazy' loads them one select
+# per track and relationship when first touched; the others load them for the whole listing at once. Collections
+# are never joined: SQLite materializes the nested join over the association table with a full scan.
+TRACK_LOADING_STRATEGIES = {
+    'selectin': (selectinload, selectinload),
+    'joined': (joinedload, selectinload),
+    'lazy': None,
+}
+
+
+def create_database_engine(database_uri: str, echo: bool = False, pool: str = 'null', pool_size: int = 5,
+                           max_overflow: int = 10, pool_pre_ping: bool = True):
+    """ Creates the engine of the database repository.
+
+    pool 'null' opens and closes a connection for every session, 'queue' keeps up to pool_size connections open
+    for reuse, opening up to max_overflow more under load and checking each one with a ping before handing it out.
+    An in-memory database lives and dies with its connection, so pooling shares a single connection instead.
+    """
+    options = {'connect_args': {'check_same_thread': False}, 'echo': echo}
+    if pool == 'null':
+        options['poolclass'] = NullPool
+    elif pool == 'queue':
+        if make_url(database_uri).database in (None, '', ':memory:'):
+            options['poolclass'] = StaticPool
+        else:
+            options.update(poolclass=QueuePool, pool_size=pool_size, max_overflow=max_overflow,
+                           pool_pre_ping=pool_pre_ping)
+    else:
+        raise ValueError(f'Unknown connection pool {pool!r}')
+    return create_engine(database_uri, **options)
+
+
+def enable_sqlite_performance_profile(engine, cache_size: int = -64000, mmap_size: int = 268435456):
+    """ Tunes every new SQLite connection of engine for concurrent reads next to writes.
+
+    WAL journaling lets readers keep reading while a review or playlist is written, and synchronous=NORMAL only
+    syncs at checkpoints, which is safe in WAL mode. cache_size is in pages, or in KiB when negative, and
+    mmap_size in bytes. Must be called before the engine opens its first connection.
+    """
+    pragmas = ('PRAGMA journal_mode=WAL', 'PRAGMA synchronous=NORMAL', f'PRAGMA cache_size={int(cache_size)}',
+               f'PRAGMA mmap_size={int(mmap_size)}', 'PRAGMA temp_store=MEMORY')
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
 class SessionContextManager:
     def __init__(self, session_factory):
         self.__session_factory = session_factory
@@ -41,9 +115,10 @@ class SessionContextManager:
 
     def reset_session(self):
         # this method can be used e.g. to allow Flask to start a new session for each http request,
-        # via the 'before_request' callback
+        # via the 'before_request' callback. The scoped_session registry is kept: closing hands the connection
+        # back to the pool and empties the calling thread's session, which the next request then reuses.
+        # Replacing the registry would also close sessions that other threads are still using.
         self.close_current_session()
-        self.__session = scoped_session(self.__session_factory)
 
     def close_current_session(self):
         if not self.__session is None:
@@ -51,8 +126,24 @@ class SessionContextManager:
 
 class SqlAlchemyRepository(AbstractRepository):
 
-    def __init__(self, session_factory):
+    def __init__(self, session_factory, track_loading: str = 'selectin'):
+        if track_loading not in TRACK_LOADING_STRATEGIES:
+            raise ValueError(f'Unknown track loading strategy {track_loading!r}')
         self._session_cm = SessionContextManager(session_factory)
+        self._has_search_index = False
+        self._track_loaders = TRACK_LOADING_STRATEGIES[track_loading]
+
+    def _track_loader_options(self) -> list:
+        if self._track_loaders is None:
+            return []
+        reference_loader, collection_loader = self._track_loaders
+        return [reference_loader(Track._Track__artist), reference_loader(Track._Track__album),
+                collection_loader(Track._Track__genres)]
+
+    def _track_query(self):
+        """ Returns a query for tracks whose artist, album and genres are loaded with the configured strategy. """
+        query = self._session_cm.session.query(Track)
+        return query.options(*self._track_loader_options())
 
     def close_session(self):
         self._session_cm.close_current_session()
@@ -63,7 +154,73 @@ class SqlAlchemyRepository(AbstractRepository):
     def load_tracks(self, tracks):
         print('....LOADING TRACKS...')
         for t in tracks:
-            self.add_track(t)
+            with self._session_cm as scm:
+                scm.session.merge(t)
+                scm.commit()
+        self.rebuild_search_index()
+
+    def bulk_load_tracks(self, tracks: Iterable[Track], batch_size: int = 1000) -> int:
+        """ Inserts tracks together with their artists, albums, genres and track_genre rows using batched
+        executemany inserts, one transaction per batch, instead of a merge and commit per object.
+
+        Artists, albums and genres are taken from the tracks and inserted once each, so the tables must not
+        already hold any of them. Returns the number of rows inserted.
+        """
+        print('....BULK LOADING TRACKS...')
+        start = time.perf_counter()
+        seen_artists, seen_albums, seen_genres, seen_tracks = set(), set(), set(), set()
+        batch = {orm.artists: [], orm.albums: [], orm.genres: [], orm.tracks: [], orm.track_genre: []}
+        number_of_rows = 0
+
+        for track in tracks:
+            if track.track_id in seen_tracks:
+                continue
+            seen_tracks.add(track.track_id)
+
+            artist, album = track.artist, track.album
+            if artist is not None and artist.artist_id not in seen_artists:
+                seen_artists.add(artist.artist_id)
+                batch[orm.artists].append({'artist_id': artist.artist_id, 'full_name': artist.full_name})
+            if album is not None and album.album_id not in seen_albums:
+                seen_albums.add(album.album_id)
+                batch[orm.albums].append({
+                    'album_id': album.album_id, 'title': album.title, 'album_url': album.album_url,
+                    'album_type': album.album_type, 'release_year': album.release_year
+                })
+            for genre in track.genres:
+                if genre.genre_id not in seen_genres:
+                    seen_genres.add(genre.genre_id)
+                    batch[orm.genres].append({'genre_id': genre.genre_id, 'genre_name': genre.name})
+                batch[orm.track_genre].append({'track_id': track.track_id, 'genre_id': genre.genre_id})
+            batch[orm.tracks].append({
+                'track_id': track.track_id, 'title': track.title, 'track_duration': track.track_duration,
+                'track_url': track.track_url,
+                'artist_id': artist.artist_id if artist is not None else None,
+                'album_id': album.album_id if album is not None else None
+            })
+
+            if len(batch[orm.tracks]) >= batch_size:
+                number_of_rows += self.__insert_batch(batch)
+
+        number_of_rows += self.__insert_batch(batch)
+
+        elapsed = time.perf_counter() - start
+        rate = number_of_rows / elapsed if elapsed > 0 else float('inf')
+        print(f'....BULK LOADED {number_of_rows} ROWS IN {elapsed:.2f}s ({rate:.0f} ROWS/S)')
+        return number_of_rows
+
+    def __insert_batch(self, batch: dict) -> int:
+        number_of_rows = 0
+        with self._session_cm as scm:
+            # Parent tables first, so the batch never references rows that do not exist yet.
+            for table in (orm.artists, orm.albums, orm.genres, orm.tracks, orm.track_genre):
+                rows = batch[table]
+                if rows:
+                    scm.session.execute(table.insert(), rows)
+                    number_of_rows += len(rows)
+                    rows.clear()
+            scm.commit()
+        return number_of_rows
 
     def load_artists(self, artists):
         print('....LOADING ARTISTS...')
@@ -85,8 +242,8 @@ class SqlAlchemyRepository(AbstractRepository):
         p1 = PlayList(0, "Developers' picks")
 
         indices = [2, 3, 5, 10, 20]
-        for a in indices:
-            p1.add_track(self.get_track(a))
+        for track in self.get_tracks_by_ids(indices):
+            p1.add_track(track)
         self.add_playlist(p1)
 
     def add_user(self, user: User):
@@ -97,6 +254,29 @@ class SqlAlchemyRepository(AbstractRepository):
     def add_track(self, track: Track):
         with self._session_cm as scm:
             scm.session.merge(track)
+            if self.has_search_index():
+                scm.session.flush()
+                scm.session.execute('DELETE FROM track_search WHERE rowid = :track_id',
+                                    {'track_id': track.track_id})
+                scm.session.execute(SEARCH_INDEX_INSERT + ' WHERE t.track_id = :track_id',
+                                    {'track_id': track.track_id})
+            scm.commit()
+
+    def has_search_index(self) -> bool:
+        # The track_search table only exists when the SQLite build supports FTS5 trigram indexes. Tables may be
+        # created after the repository, so only a positive answer is remembered.
+        if not self._has_search_index and self._session_cm.session.bind.dialect.name == 'sqlite':
+            row = self._session_cm.session.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'track_search'").fetchone()
+            self._has_search_index = row is not None
+        return self._has_search_index
+
+    def rebuild_search_index(self):
+        if not self.has_search_index():
+            return
+        with self._session_cm as scm:
+            scm.session.execute('DELETE FROM track_search')
+            scm.session.execute(SEARCH_INDEX_INSERT)
             scm.commit()
 
     def get_user(self, user_name: str) -> User:
@@ -118,38 +298,108 @@ class SqlAlchemyRepository(AbstractRepository):
 
         return track
 
+    def get_tracks_by_ids(self, track_ids: List[int]) -> list:
+        return self.__get_tracks_by_ids(track_ids, self._track_query())
+
+    def __get_tracks_by_ids(self, track_ids: List[int], query) -> list:
+        unique_ids = list(dict.fromkeys(track_ids))
+        tracks_by_id = dict()
+        # One IN query per TRACK_ID_BATCH_SIZE ids keeps below SQLite's limit on bound parameters.
+        for start in range(0, len(unique_ids), TRACK_ID_BATCH_SIZE):
+            batch = unique_ids[start:start + TRACK_ID_BATCH_SIZE]
+            for track in query.filter(Track._Track__track_id.in_(batch)):
+                tracks_by_id[track.track_id] = track
+        return [tracks_by_id[track_id] for track_id in track_ids if track_id in tracks_by_id]
+
+    def __keyset_page(self, query, key, limit: int, after=None, before=None) -> list:
+        # Seeking on the primary key lets SQLite start the range scan at the cursor instead of counting an offset.
+        if before is not None:
+            return query.filter(key < before).order_by(key.desc()).limit(limit).all()[::-1]
+        if after is not None:
+            query = query.filter(key > after)
+        return query.order_by(key).limit(limit).all()
+
     def get_tracks(self):
-        tracks = self._session_cm.session.query(Track).all()
+        tracks = self._track_query().all()
+        return tracks
+
+    def sample_tracks(self, k: int) -> list:
+        session = self._session_cm.session
+        track_id = Track._Track__track_id
+        # SQLite answers a lone min or max from the primary key without reading the table, but not both at once.
+        min_id, max_id = session.query(select([func.min(track_id)]).as_scalar(),
+                                       select([func.max(track_id)]).as_scalar()).one()
+        if min_id is None or k <= 0:
+            return []
+
+        # Ids drawn uniformly from the id range and kept when they exist are a uniform sample of the tracks.
+        id_range = range(min_id, max_id + 1)
+        drawn_ids = set()
+        sample = []
+        batch_size = 4 * k
+        for _ in range(SAMPLE_ROUNDS):
+            ids = [id for id in random.sample(id_range, min(batch_size, len(id_range))) if id not in drawn_ids]
+            drawn_ids.update(ids)
+            # Samples feed the sidebar, which shows titles only, so related objects are left to lazy loading.
+            sample.extend(self.__get_tracks_by_ids(ids, session.query(Track))[:k - len(sample)])
+            if len(sample) == k or len(drawn_ids) == len(id_range):
+                return sample
+            batch_size *= 4
+
+        # The ids are too sparse for rejection sampling, so let SQLite shuffle the remaining tracks.
+        sampled_ids = [track.track_id for track in sample]
+        sample.extend(session.query(Track).filter(~track_id.in_(sampled_ids)).order_by(
+            func.random()).limit(k - len(sample)).all())
+        return sample
+
+    def get_tracks_page(self, offset: int, limit: int):
+        tracks = self._track_query().order_by(Track._Track__track_id).offset(offset).limit(limit).all()
         return tracks
 
+    def get_tracks_keyset_page(self, limit: int, after: int = None, before: int = None):
+        return self.__keyset_page(self._track_query(), Track._Track__track_id, limit, after, before)
+
     def get_number_of_tracks(self):
         number_of_tracks = self._session_cm.session.query(Track).count()
         return number_of_tracks
 
     def get_tracks_by_artist(self, artist: Artist):
         if artist is None:
-            tracks = self._session_cm.session.query(Track).all()
+            tracks = self._track_query().all()
             return tracks
         else:
-            tracks = self._session_cm.session.query(Track).filter(Track._Track__artist == artist).all()
+            tracks = self._track_query().filter(Track._Track__artist == artist).all()
             return tracks
     
     def search_tracks(self, input: str):
-        dataset_of_tracks = self._session_cm.session.query(Track).all()
-        tracks = []
         input = input.lower()
-        for track in dataset_of_tracks:
-            genre_match = False
-            if len(track.genres) == 1:
-                if input in track.genres[0].name.lower():
-                    genre_match = True
-            elif len(track.genres) > 1:
-                for g in track.genres:
-                    if input in g.name.lower():
-                        genre_match = True
-
-            if input in track.title.lower() or (track.artist is not None and input in track.artist.full_name.lower()) or (track.album is not None and input in track.album.title.lower()) or genre_match:
-                tracks.append(track)
+        if not self.has_search_index():
+            dataset_of_tracks = self._session_cm.session.query(Track).order_by(Track._Track__track_id).all()
+            return [track for track in dataset_of_tracks if track_matches(track, input)]
+
+        if input == '':
+            return self._track_query().order_by(Track._Track__track_id).all()
+
+        if len(input) >= 3:
+            # The trigram tokenizer matches a quoted phrase as a case-insensitive substring of any column.
+            condition = text('track_search MATCH :query').bindparams(query='"' + input.replace('"', '""') + '"')
+        elif not input.isascii():
+            # SQLite's LIKE only folds the case of ASCII letters, so these are matched in Python against the
+            # index rows, which still avoids loading every track.
+            fields = select([track_search.c.rowid, track_search.c.title, track_search.c.artist_name,
+                             track_search.c.album_title, track_search.c.genre_names])
+            matching_ids = sorted(row[0] for row in self._session_cm.session.execute(fields)
+                                  if any(field is not None and input in field.lower() for field in row[1:]))
+            return self.get_tracks_by_ids(matching_ids)
+        else:
+            # Queries shorter than a trigram cannot use MATCH; LIKE still runs against the index table only.
+            pattern = '%' + input.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            condition = or_(*(track_search.c[name].like(pattern, escape='\\')
+                              for name in ('title', 'artist_name', 'album_title', 'genre_names')))
+
+        matching_ids = select([track_search.c.rowid]).where(condition)
+        tracks = self._track_query().filter(
+            Track._Track__track_id.in_(matching_ids)).order_by(Track._Track__track_id).all()
         return tracks
 
     def add_artist(self, artist: Artist):
@@ -170,12 +420,21 @@ class SqlAlchemyRepository(AbstractRepository):
     def get_artists(self):
         artists = []
         try:
-            artists = self._session_cm.session.query(Artist).all()
+            artists = self._session_cm.session.query(Artist).order_by(Artist._Artist__artist_id).all()
         except NoResultFound:
             pass
 
         return artists
 
+    def get_artists_page(self, offset: int, limit: int):
+        artists = self._session_cm.session.query(Artist).order_by(
+            Artist._Artist__artist_id).offset(offset).limit(limit).all()
+        return artists
+
+    def get_artists_keyset_page(self, limit: int, after: int = None, before: int = None):
+        return self.__keyset_page(
+            self._session_cm.session.query(Artist), Artist._Artist__artist_id, limit, after, before)
+
     def add_genre(self, genre: Genre):
         with self._session_cm as scm:
             scm.session.merge(genre)
@@ -184,11 +443,20 @@ class SqlAlchemyRepository(AbstractRepository):
     def get_genres(self):
         genres = []
         try:
-            genres = self._session_cm.session.query(Genre).all()
+            genres = self._session_cm.session.query(Genre).order_by(Genre._Genre__genre_id).all()
         except NoResultFound:
             pass
         return genres
 
+    def get_genres_page(self, offset: int, limit: int):
+        genres = self._session_cm.session.query(Genre).order_by(
+            Genre._Genre__genre_id).offset(offset).limit(limit).all()
+        return genres
+
+    def get_genres_keyset_page(self, limit: int, after: int = None, before: int = None):
+        return self.__keyset_page(
+            self._session_cm.session.query(Genre), Genre._Genre__genre_id, limit, after, before)
+
     def add_album(self, album: Album):
         with self._session_cm as scm:
             scm.session.merge(album)
@@ -207,21 +475,40 @@ class SqlAlchemyRepository(AbstractRepository):
     def get_albums(self):
         albums = []
         try:
-            albums = self._session_cm.session.query(Album).all()
+            albums = self._session_cm.session.query(Album).order_by(Album._Album__album_id).all()
         except NoResultFound:
             pass
 
         return albums
 
+    def get_albums_page(self, offset: int, limit: int):
+        albums = self._session_cm.session.query(Album).order_by(
+            Album._Album__album_id).offset(offset).limit(limit).all()
+        return albums
+
+    def get_albums_keyset_page(self, limit: int, after: int = None, before: int = None):
+        return self.__keyset_page(
+            self._session_cm.session.query(Album), Album._Album__album_id, limit, after, before)
+
     def add_review(self, review: Review):
         with self._session_cm as scm:
             scm.session.add(review)
             scm.commit()
 
     def get_reviews(self, track: Track):
-        reviews = self._session_cm.session.query(Review).filter(Track._Track__track_id == track.track_id).all()
+        reviews = self._session_cm.session.query(Review).filter(
+            Review._Review__track == track).order_by(orm.reviews.c.id).all()
+        return reviews
+
+    def get_reviews_page(self, track: Track, offset: int, limit: int = None) -> list:
+        # Review ids grow as reviews are posted, so descending ids list the newest reviews first.
+        reviews = self._session_cm.session.query(Review).filter(
+            Review._Review__track == track).order_by(orm.reviews.c.id.desc()).offset(offset).limit(limit).all()
         return reviews
 
+    def get_number_of_reviews(self, track: Track) -> int:
+        return self._session_cm.session.query(Review).filter(Review._Review__track == track).count()
+
     def add_playlist(self, playlist: PlayList):
         with self._session_cm as scm:
             scm.session.add(playlist)
@@ -230,11 +517,20 @@ class SqlAlchemyRepository(AbstractRepository):
     def get_playlist(self, playlist_id: int):
         playlist = None
         try:
-            playlist = self._session_cm.session.query(PlayList).filter(PlayList._PlayList__playlist_id == playlist_id).one()
+            query = self._session_cm.session.query(PlayList)
+            if self._track_loaders is not None:
+                collection_loader = self._track_loaders[1]
+                query = query.options(
+                    collection_loader(PlayList._PlayList__list_of_tracks).options(*self._track_loader_options()))
+            playlist = query.filter(PlayList._PlayList__playlist_id == playlist_id).one()
         except NoResultFound:
             pass
         return playlist
 
+    def get_playlist_by_name(self, name: str):
+        return self._session_cm.session.query(PlayList).filter(
+            orm.playlists.c.name_key == normalize_playlist_name(name)).first()
+
     def get_playlists(self):
         playlists = []
         try:
@@ -244,6 +540,9 @@ class SqlAlchemyRepository(AbstractRepository):
 
         return playlists
 
+    def get_number_of_playlists(self):
+        return self._session_cm.session.query(PlayList).count()
+
     def add_track_to_playlist(self, playlist_id: int, track_id: int):
         playlist = self.get_playlist(playlist_id)
         track = self.get_track(track_id)
@@ -252,14 +551,11 @@ class SqlAlchemyRepository(AbstractRepository):
         
 
     def create_random_playlist(self, length: int):
-        playlists = self._session_cm.session.query(PlayList).all()
-        dataset_of_tracks = self._session_cm.session.query(Track).all()
-
-        id = len(playlists)
+        id = self.get_number_of_playlists()
         name = 'Random Playlist #' + str(id)
         p = PlayList(id, name)
 
-        tracks = random.choices(dataset_of_tracks, k=length)
+        tracks = self.sample_tracks(length)
         p.tracks = tracks
 
         self.add_playlist(p)
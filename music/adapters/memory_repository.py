@@ -1,14 +1,19 @@
 import csv, random
+from array import array
+from collections import defaultdict
 from pathlib import Path
 from datetime import date, datetime
 from typing import List
 
-from bisect import bisect, bisect_left, insort_left
+from bisect import bisect, bisect_left, bisect_right
 
 from werkzeug.security import generate_password_hash
 
 from music.adapters.csvdatareader import TrackCSVReader
-from music.adapters.repository import AbstractRepository, RepositoryException
+from music.adapters.catalogue_cache import load_catalogue
+from music.adapters.repository import AbstractRepository, RepositoryException, normalize_playlist_name
+from music.adapters.search_index import TrackSearchIndex, searchable_fields, track_matches
+from music.adapters.track_store import TRACK_STORES
 
 from music.domainmodel.artist import Artist
 from music.domainmodel.album import Album
@@ -21,176 +26,287 @@ from music.tracks.services import get_playlist, get_track_by_id
 from music.tracks.tracks import playlist
 
 
+def track_id_array() -> array:
+    return array('q')
+
+
+def keyset_slice(sorted_keys: list, limit: int, after=None, before=None) -> slice:
+    """ Locates a keyset page in sorted_keys by bisection, so deep pages cost no more than the first one. """
+    if before is not None:
+        stop = bisect_left(sorted_keys, before)
+        return slice(max(stop - limit, 0), stop)
+    start = 0 if after is None else bisect_right(sorted_keys, after)
+    return slice(start, start + limit)
+
+
 class MemoryRepository(AbstractRepository):
 
-    def __init__(self):
-        # List of unique tracks
-        self.__dataset_of_tracks = []
-        # Set of unique artists
-        self.__dataset_of_artists = set()
-        # Set of unique albums
-        self.__dataset_of_albums = set()
-        # Set of unique genres
-        self.__dataset_of_genres = set()
-        self.__track_index = dict()
-
-        self.__dataset_of_reviews = list()
-        self.__users = list()
+    def __init__(self, track_store: str = 'objects'):
+        if track_store not in TRACK_STORES:
+            raise ValueError(f'Unknown track store {track_store!r}, expected one of {", ".join(TRACK_STORES)}')
+        # Unique tracks in id order, held as Track objects or in columns (see track_store)
+        self.__tracks = TRACK_STORES[track_store]()
+        # Unique artists, albums and genres in id order, so listings and pages are slices
+        self.__dataset_of_artists = []
+        self.__dataset_of_albums = []
+        self.__dataset_of_genres = []
+        # Their ids in the same order, bisected to place new entities and to find keyset pages
+        self.__artist_ids = []
+        self.__album_ids = []
+        self.__genre_ids = []
+        # Id-keyed indexes of the catalogue entities
+        self.__artist_index = dict()
+        self.__album_index = dict()
+        self.__genre_index = dict()
+        # Posting lists of sorted track ids per artist id, album id and genre name, as compact integer arrays
+        self.__track_ids_by_artist = defaultdict(track_id_array)
+        self.__track_ids_by_album = defaultdict(track_id_array)
+        self.__track_ids_by_genre = defaultdict(track_id_array)
+        # Trigram index over title, artist, album and genre names used by search_tracks
+        self.__search_index = TrackSearchIndex()
+
+        # Reviews per track id, in the order they were posted
+        self.__reviews_by_track = defaultdict(list)
+        # Users by user name and by user id
+        self.__users = dict()
+        self.__users_by_id = dict()
         self.__playlists = list()
+        # Playlists by id and by normalized name
+        self.__playlist_index = dict()
+        self.__playlists_by_name = dict()
 
     def add_user(self, user: User):
-        self.__users.append(user)
+        # The first user added under a name or id keeps it, as lookups used to return the first match.
+        self.__users.setdefault(user.user_name, user)
+        self.__users_by_id.setdefault(user.user_id, user)
 
     def get_user_by_id(self, user_id) -> User:
-        for user in self.__users:
-            if user.user_id == user_id:
-                return user
-        return None
+        return self.__users_by_id.get(user_id)
 
     def get_artist(self, id) -> Artist:
-        for artist in self.__dataset_of_artists:
-            if artist.artist_id == id:
-                return artist
-        return None
+        return self.__artist_index.get(id)
 
     def get_user(self, user_name) -> User:
-        return next((user for user in self.__users if user.user_name == user_name), None)
+        return self.__users.get(user_name)
 
     def load_tracks(self, track_list: List):
-        self.__dataset_of_tracks = track_list
+        # The indexes see the same tracks as the store: one per id, the last given, in id order.
+        tracks_by_id = {track.track_id: track for track in track_list}
+        track_list = [tracks_by_id[track_id] for track_id in sorted(tracks_by_id)]
+        self.__track_ids_by_artist.clear()
+        self.__track_ids_by_album.clear()
+        self.__track_ids_by_genre.clear()
+        self.__search_index.clear()
         for track in track_list: 
-            self.__track_index[track.track_id] = track
-            
+            self.__index_track(track)
+        self.__search_index.add_tracks(track_list)
+        self.__tracks.load(track_list)
 
     def add_track(self, track: Track):
-        insort_left(self.__dataset_of_tracks, track)
-        self.__track_index[track.track_id] = track
+        # A track replacing a stored one with the same id is indexed afresh, so the old one is de-indexed first.
+        replaced = self.__tracks.get(track.track_id)
+        if replaced is not None:
+            self.__unindex_track(replaced)
+            self.__search_index.remove_track(replaced)
+        self.__tracks.add(track)
+        self.__index_track(track)
+        self.__search_index.add_track(track)
+
+    def __posting_lists(self, track: Track) -> list:
+        posting_lists = [self.__track_ids_by_artist[track.artist.artist_id if track.artist is not None else None]]
+        if track.album is not None:
+            posting_lists.append(self.__track_ids_by_album[track.album.album_id])
+        for genre in track.genres:
+            posting_lists.append(self.__track_ids_by_genre[genre.name])
+        return posting_lists
+
+    def __index_track(self, track: Track):
+        # Tracks mostly arrive in id order, so insort only appends and the posting lists stay sorted by id.
+        track_id = track.track_id
+        for track_ids in self.__posting_lists(track):
+            index = bisect_left(track_ids, track_id)
+            if index == len(track_ids) or track_ids[index] != track_id:
+                track_ids.insert(index, track_id)
+
+    def __unindex_track(self, track: Track):
+        track_id = track.track_id
+        for track_ids in self.__posting_lists(track):
+            index = bisect_left(track_ids, track_id)
+            if index < len(track_ids) and track_ids[index] == track_id:
+                del track_ids[index]
 
     def get_track(self, id: int) -> Track:
-        track = None
-        try:
-            track = self.__track_index[id]
-        except KeyError:
-            pass
-        return track
-        # for track in self.__dataset_of_tracks:
-        #     if track.track_id == id:
-        #         return track
-        # return None
+        return self.__tracks.get(id)
 
     def get_tracks(self) -> list: 
-        return self.__dataset_of_tracks
+        return self.__tracks.tracks()
+
+    def sample_tracks(self, k: int) -> list:
+        positions = random.sample(range(len(self.__tracks)), max(min(k, len(self.__tracks)), 0))
+        return [self.__tracks[position] for position in positions]
+
+    def get_tracks_page(self, offset: int, limit: int) -> list:
+        # The store is kept sorted by track id, so a page is a plain slice.
+        return self.__tracks[offset:offset + limit]
+
+    def get_tracks_keyset_page(self, limit: int, after: int = None, before: int = None) -> list:
+        # The id sequence runs parallel to the stored tracks, so the page found in it is the same slice of tracks.
+        return self.__tracks[keyset_slice(self.__tracks.track_ids, limit, after, before)]
 
     def get_number_of_tracks(self):
-        return len(self.__dataset_of_tracks)
+        return len(self.__tracks)
 
     def get_tracks_by_artist(self, artist: Artist):
-        selected_tracks = []
-        for track in self.__dataset_of_tracks: 
-            if track.artist == artist:
-                selected_tracks.append(track)
-        return selected_tracks
+        if artist is not None and not isinstance(artist, Artist):
+            return []
+        track_ids = self.__track_ids_by_artist.get(artist.artist_id if artist is not None else None, [])
+        return [self.__tracks.get(track_id) for track_id in track_ids]
+
+    def get_tracks_by_album(self, album: Album):
+        track_ids = self.__track_ids_by_album.get(album.album_id, []) if isinstance(album, Album) else []
+        return [self.__tracks.get(track_id) for track_id in track_ids]
 
     def add_artist(self, artist: Artist):
         if isinstance(artist, Artist):
-            self.__dataset_of_artists.add(artist)
+            if artist.artist_id not in self.__artist_index:
+                self.__artist_index[artist.artist_id] = artist
+                position = bisect_left(self.__artist_ids, artist.artist_id)
+                self.__artist_ids.insert(position, artist.artist_id)
+                self.__dataset_of_artists.insert(position, artist)
 
     def load_artists(self, artist_set: set):
-        self.__dataset_of_artists = artist_set
+        self.__dataset_of_artists = sorted(artist_set)
+        self.__artist_index = {artist.artist_id: artist for artist in self.__dataset_of_artists}
+        self.__artist_ids = [artist.artist_id for artist in self.__dataset_of_artists]
 
     def get_artists(self) -> Artist:
         return self.__dataset_of_artists
 
+    def get_artists_page(self, offset: int, limit: int) -> list:
+        return self.__dataset_of_artists[offset:offset + limit]
+
+    def get_artists_keyset_page(self, limit: int, after: int = None, before: int = None) -> list:
+        return self.__dataset_of_artists[keyset_slice(self.__artist_ids, limit, after, before)]
+
     def load_genres(self, genre_set: set):
-        self.__dataset_of_genres = genre_set
+        self.__dataset_of_genres = sorted(genre_set)
+        self.__genre_index = {genre.genre_id: genre for genre in self.__dataset_of_genres}
+        self.__genre_ids = [genre.genre_id for genre in self.__dataset_of_genres]
 
     def add_genre(self, genre: Genre):
         if isinstance(genre, Genre):
-            self.__dataset_of_genres.add(genre)
+            if genre.genre_id not in self.__genre_index:
+                self.__genre_index[genre.genre_id] = genre
+                position = bisect_left(self.__genre_ids, genre.genre_id)
+                self.__genre_ids.insert(position, genre.genre_id)
+                self.__dataset_of_genres.insert(position, genre)
+
+    def get_genre(self, genre_id: int) -> Genre:
+        return self.__genre_index.get(genre_id)
 
     def get_genres(self) -> Genre:
         return self.__dataset_of_genres
 
+    def get_genres_page(self, offset: int, limit: int) -> list:
+        return self.__dataset_of_genres[offset:offset + limit]
+
+    def get_genres_keyset_page(self, limit: int, after: int = None, before: int = None) -> list:
+        return self.__dataset_of_genres[keyset_slice(self.__genre_ids, limit, after, before)]
+
     def get_number_of_genres(self):
         return len(self.__dataset_of_genres)
 
     def get_track_ids_by_genre(self, genre_name: str):
-        track_ids = []
-        for track in self.__dataset_of_tracks:
-            genre_list = []
-            for genre in track.genres:
-                genre_list.append(genre.name)
-            if genre_name in genre_list:
-                track_ids.append(track.track_id)
-        return track_ids
+        return list(self.__track_ids_by_genre.get(genre_name, []))
+
     def get_tracks_by_ids(self, track_ids: List):
-        # Strip out any ids in id_list that don't represent Article ids in the repository.
-        existing_ids = [id for id in track_ids if id in self.__track_index]
-        tracks = [self.__dataset_of_tracks[id] for id in existing_ids]
-        return tracks
+        # Strip out any ids in track_ids that don't represent Track ids in the repository.
+        tracks = [self.__tracks.get(id) for id in track_ids]
+        return [track for track in tracks if track is not None]
 
     def search_tracks(self, input: str):
         ''' search by title, artist, genre or album'''
-        tracks = []
         input = input.lower()
-        for track in self.__dataset_of_tracks:
-            genre_match = False
-            if len(track.genres) == 1:
-                if input in track.genres[0].name.lower():
-                    genre_match = True
-            elif len(track.genres) > 1:
-                for g in track.genres:
-                    if input in g.name.lower():
-                        genre_match = True
-
-            if input in track.title.lower() or (track.artist is not None and input in track.artist.full_name.lower()) or (track.album is not None and input in track.album.title.lower()) or genre_match:
-                tracks.append(track)
+        if input == '':
+            return [track for track in self.__tracks.tracks() if searchable_fields(track)]
+
+        track_ids = self.__search_index.candidates(input)
+        tracks = [self.__tracks.get(track_id) for track_id in track_ids]
+        if not self.__search_index.is_exact(input):
+            tracks = [track for track in tracks if track_matches(track, input)]
         return tracks
 
     def track_index(self, track: Track):
-        index = bisect_left(self.__dataset_of_tracks, track)
-        if index != len(self.__dataset_of_tracks) and self.__dataset_of_tracks[index].track_id == track.track_id:
-            return index
-        raise ValueError
+        return self.__tracks.position(track.track_id)
 
 
     def load_albums(self, albums_set: set):
-        self.__dataset_of_albums = albums_set
+        self.__dataset_of_albums = sorted(albums_set)
+        self.__album_index = {album.album_id: album for album in self.__dataset_of_albums}
+        self.__album_ids = [album.album_id for album in self.__dataset_of_albums]
 
     def add_album(self, album: Album):
         if isinstance(album, Album):
-            self.__dataset_of_albums.add(album)
+            if album.album_id not in self.__album_index:
+                self.__album_index[album.album_id] = album
+                position = bisect_left(self.__album_ids, album.album_id)
+                self.__album_ids.insert(position, album.album_id)
+                self.__dataset_of_albums.insert(position, album)
+
+    def get_album(self, album_id: int) -> Album:
+        return self.__album_index.get(album_id)
 
     def get_albums(self):
         return self.__dataset_of_albums
 
+    def get_albums_page(self, offset: int, limit: int) -> list:
+        return self.__dataset_of_albums[offset:offset + limit]
+
+    def get_albums_keyset_page(self, limit: int, after: int = None, before: int = None) -> list:
+        return self.__dataset_of_albums[keyset_slice(self.__album_ids, limit, after, before)]
+
     def get_number_of_albums(self):
         return len(self.__dataset_of_albums)
 
     def add_review(self, review: Review):
         if isinstance(review, Review):
-            self.__dataset_of_reviews.append(review)
+            track_id = review.track.track_id if review.track is not None else None
+            self.__reviews_by_track[track_id].append(review)
 
     def get_reviews(self, track: Track):
-        reviews = []
-        for review in self.__dataset_of_reviews:
-            if review.track == track:
-                reviews.append(review)
-        return reviews
+        if not isinstance(track, Track):
+            return []
+        return list(self.__reviews_by_track.get(track.track_id, []))
+
+    def get_reviews_page(self, track: Track, offset: int, limit: int = None) -> list:
+        # Reviews are appended as they are posted, so the newest ones are read backwards from the end.
+        reviews = self.__reviews_by_track.get(track.track_id, []) if isinstance(track, Track) else []
+        end = max(len(reviews) - offset, 0)
+        start = 0 if limit is None else max(end - limit, 0)
+        return reviews[start:end][::-1]
+
+    def get_number_of_reviews(self, track: Track) -> int:
+        return len(self.__reviews_by_track.get(track.track_id, [])) if isinstance(track, Track) else 0
 
     def add_playlist(self, playlist: PlayList):
         if isinstance(playlist, PlayList):
             self.__playlists.append(playlist)
+            self.__playlist_index.setdefault(playlist.playlist_id, playlist)
+            if playlist.name is not None:
+                self.__playlists_by_name.setdefault(normalize_playlist_name(playlist.name), playlist)
 
     def get_playlist(self, playlist_id: int):
-        for playlist in self.__playlists:
-            if playlist.playlist_id == playlist_id:
-                return playlist
-        return None
+        return self.__playlist_index.get(playlist_id)
+
+    def get_playlist_by_name(self, name: str):
+        return self.__playlists_by_name.get(normalize_playlist_name(name))
 
     def get_playlists(self):
         return self.__playlists
 
+    def get_number_of_playlists(self):
+        return len(self.__playlists)
+
     def add_track_to_playlist(self, playlist: PlayList, track: Track):
         if track not in playlist.tracks:
             playlist.add_track(track)          
@@ -201,34 +317,42 @@ class MemoryRepository(AbstractRepository):
         indices = [0, 1, 2, 141, 165, 167, 204, 252, 306, 307, 316, 318, 350, 458, 495, 601]
 
         for i in indices: 
-            p1.add_track(self.__dataset_of_tracks[i])  
+            p1.add_track(self.__tracks[i])  
 
-        self.__playlists.append(p1)
+        self.add_playlist(p1)
 
     def create_random_playlist(self, length: int):
         id = len(self.__playlists)
         name = 'Random Playlist #' + str(id)
         p = PlayList(id, name)
 
-        tracks = random.choices(self.__dataset_of_tracks, k=length)
+        tracks = self.sample_tracks(length)
         p.tracks = tracks
         
-        self.__playlists.append(p)
+        self.add_playlist(p)
 
         return p
 
 
 
-def populate(data_path: Path, repo: MemoryRepository):
+def populate(data_path: Path, repo: MemoryRepository, use_cache: bool = True, processes: int = 1):
     albums_filename = str(Path(data_path) / "raw_albums_excerpt.csv")
     tracks_filename = str(Path(data_path) / "raw_tracks_excerpt.csv")
 
-    csvreader = TrackCSVReader(albums_filename, tracks_filename)
-    csvreader.read_csv_files()
-    repo.load_tracks(csvreader.dataset_of_tracks)
-    repo.load_artists(csvreader.dataset_of_artists)
-    repo.load_genres(csvreader.dataset_of_genres)
-    repo.load_albums(csvreader.dataset_of_albums)
+    if use_cache or processes > 1:
+        # Loads a snapshot of the parsed catalogue when the CSV files are unchanged since it was taken.
+        tracks, artists, albums, genres = load_catalogue(albums_filename, tracks_filename, use_cache, processes)
+        repo.load_tracks(tracks)
+        repo.load_artists(artists)
+        repo.load_genres(genres)
+        repo.load_albums(albums)
+    else:
+        csvreader = TrackCSVReader(albums_filename, tracks_filename)
+        for track in csvreader.iter_tracks():
+            repo.add_track(track)
+        repo.load_artists(csvreader.dataset_of_artists)
+        repo.load_genres(csvreader.dataset_of_genres)
+        repo.load_albums(csvreader.dataset_of_albums)
     repo.load_playlists()
 
 
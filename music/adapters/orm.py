@@ -1,8 +1,9 @@
 from sqlalchemy import (
     Table, MetaData, Column, Integer, String, Date, DateTime,
-    ForeignKey
+    ForeignKey, Index, DDL, event, table, column, inspect
 )
 from sqlalchemy.orm import mapper, relationship, synonym
+from music.adapters.repository import normalize_playlist_name
 from music.domainmodel.artist import Artist
 from music.domainmodel.album import Album
 from music.domainmodel.track import Track
@@ -13,6 +14,11 @@ from music.domainmodel.playlist import PlayList
 
 metadata = MetaData()
 
+# Revision of the tables below, stored in PRAGMA user_version. Bump it together with a step in upgrade_schema.
+# 1: integer artist key, indexes on the foreign keys used by joins and lookups.
+# 2: normalized playlist name key replacing the index on lower(name).
+SCHEMA_VERSION = 2
+
 users = Table(
     'users', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
@@ -23,7 +29,7 @@ users = Table(
 artists = Table(
     'artists', metadata,
     Column('artist_id', Integer, primary_key=True),
-    Column('full_name', String(255), primary_key=True),
+    Column('full_name', String(255)),
 
 )
 
@@ -45,12 +51,16 @@ tracks = Table(
     Column('track_url', String(255)),
     Column('artist_id', ForeignKey('artists.artist_id')),
     Column('album_id', ForeignKey('albums.album_id')),
+    Index('ix_tracks_artist_id', 'artist_id'),
+    Index('ix_tracks_album_id', 'album_id'),
 )
 track_genre = Table(
     'track_genre', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
     Column('track_id', ForeignKey('tracks.track_id')),
     Column('genre_id', ForeignKey('genres.genre_id')),
+    Index('ix_track_genre_track_id_genre_id', 'track_id', 'genre_id'),
+    Index('ix_track_genre_genre_id_track_id', 'genre_id', 'track_id'),
 )
 
 genres = Table(
@@ -66,22 +76,100 @@ reviews = Table(
     # Column('user_id', ForeignKey('users.id')),
     Column('review_text', String(1024), nullable=False),
     Column('rating', Integer, nullable=False),
-    Column('timestamp', DateTime, nullable=False)
+    Column('timestamp', DateTime, nullable=False),
+    # Also orders a track's reviews by id, newest first, without sorting.
+    Index('ix_reviews_track_id_id', 'track_id', 'id'),
 )
 
+def playlist_name_key(context):
+    name = context.get_current_parameters()['name']
+    return normalize_playlist_name(name) if name is not None else None
+
+
 playlists = Table(
     'playlists', metadata,
     Column('playlist_id', Integer, primary_key=True, autoincrement=True),
-    Column('name', String(255))
+    Column('name', String(255)),
+    # The name as normalize_playlist_name folds it, written with the name. SQLite's lower() only folds ASCII
+    # letters, so lookups compare against this column instead.
+    Column('name_key', String(255), default=playlist_name_key, onupdate=playlist_name_key),
+    Index('ix_playlists_name_key', 'name_key'),
 )
 
 track_playlist = Table(
     'track_playlist', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
     Column('track_id', ForeignKey('tracks.track_id')),
-    Column('playlist_id', ForeignKey('playlists.playlist_id'))
+    Column('playlist_id', ForeignKey('playlists.playlist_id')),
+    Index('ix_track_playlist_playlist_id_track_id', 'playlist_id', 'track_id'),
 )
 
+# Full text index over the searchable fields of a track, keyed by rowid = track_id. The trigram tokenizer keeps
+# the substring semantics of search_tracks. A virtual table cannot be declared with Table, so it is created and
+# dropped alongside the metadata and described here as a lightweight table clause for building queries.
+track_search = table(
+    'track_search',
+    column('rowid'), column('title'), column('artist_name'), column('album_title'), column('genre_names')
+)
+
+
+def supports_track_search(ddl, target, bind, **kw):
+    # FTS5 with the trigram tokenizer needs SQLite 3.34 or later, compiled with FTS5 enabled.
+    if bind.dialect.name != 'sqlite' or bind.dialect.dbapi.sqlite_version_info < (3, 34, 0):
+        return False
+    compile_options = [row[0] for row in bind.execute('PRAGMA compile_options')]
+    return 'ENABLE_FTS5' in compile_options
+
+
+event.listen(metadata, 'after_create', DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS track_search "
+    "USING fts5(title, artist_name, album_title, genre_names, tokenize='trigram')"
+).execute_if(callable_=supports_track_search))
+
+event.listen(metadata, 'before_drop', DDL(
+    'DROP TABLE IF EXISTS track_search'
+).execute_if(dialect='sqlite'))
+
+
+def schema_version(bind) -> int:
+    return bind.execute('PRAGMA user_version').scalar()
+
+
+def upgrade_schema(engine):
+    """ Brings a SQLite database created by an earlier revision of the tables up to SCHEMA_VERSION.
+
+    Every step is idempotent, so a database freshly created with metadata.create_all is only stamped with the
+    current version. Rows of the existing tables are kept.
+    """
+    if schema_version(engine) >= SCHEMA_VERSION:
+        return
+
+    with engine.begin() as connection:
+        # Revision 1: artists were keyed by (artist_id, full_name). SQLite cannot alter a primary key, so the
+        # table is rebuilt under a new name and renamed afterwards; renaming the old table instead would make
+        # SQLite repoint the foreign key of tracks at it.
+        artists_key = inspect(connection).get_pk_constraint('artists')['constrained_columns']
+        if artists_key != ['artist_id']:
+            artists.tometadata(MetaData(), name='artists_new').create(connection)
+            connection.execute('INSERT INTO artists_new (artist_id, full_name) '
+                               'SELECT artist_id, min(full_name) FROM artists GROUP BY artist_id')
+            connection.execute('DROP TABLE artists')
+            connection.execute('ALTER TABLE artists_new RENAME TO artists')
+        # Revision 2: playlist names are matched on a key normalized in Python, filled in for existing rows.
+        if 'name_key' not in {column_['name'] for column_ in inspect(connection).get_columns('playlists')}:
+            connection.execute('ALTER TABLE playlists ADD COLUMN name_key VARCHAR(255)')
+        for playlist_id, name in connection.execute('SELECT playlist_id, name FROM playlists WHERE name_key IS NULL '
+                                                    'AND name IS NOT NULL').fetchall():
+            connection.execute(playlists.update().where(playlists.c.playlist_id == playlist_id).values(
+                name_key=normalize_playlist_name(name)))
+        connection.execute('DROP INDEX IF EXISTS ix_playlists_name_lower')
+        existing_indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        for table_ in metadata.sorted_tables:
+            for index in table_.indexes:
+                if index.name not in existing_indexes:
+                    index.create(connection)
+        connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
 
 def map_model_to_tables():
     mapper(User, users, properties={
@@ -18,6 +18,11 @@ class RepositoryException(Exception):
         pass
 
 
+def normalize_playlist_name(name: str) -> str:
+    # Playlist names are unique regardless of case and surrounding whitespace.
+    return name.strip().lower()
+
+
 class AbstractRepository(abc.ABC):
 
     @abc.abstractmethod
@@ -46,10 +51,34 @@ class AbstractRepository(abc.ABC):
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_tracks_by_ids(self, track_ids: List[int]) -> list:
+        """ Returns the Tracks with the given ids, in the order of track_ids.
+
+        Ids that don't identify a Track in the repository are skipped.
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_tracks(self) -> list:
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def sample_tracks(self, k: int) -> list:
+        """ Returns min(k, number of tracks) distinct Tracks chosen uniformly at random. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_tracks_page(self, offset: int, limit: int) -> list:
+        """ Returns at most limit Tracks ordered by track id, skipping the first offset Tracks. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_tracks_keyset_page(self, limit: int, after: int = None, before: int = None) -> list:
+        """ Returns at most limit Tracks ordered by track id: the first ones with an id above after, or the last
+        ones with an id below before when before is given. """
+        raise NotImplementedError
+
     @abc.abstractclassmethod
     def get_number_of_tracks(self) -> int:
         raise NotImplementedError
@@ -68,6 +97,18 @@ class AbstractRepository(abc.ABC):
 
     @abc.abstractmethod
     def get_artists(self) -> Artist:
+        """ Returns every Artist ordered by artist id. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_artists_page(self, offset: int, limit: int) -> list:
+        """ Returns at most limit Artists ordered by artist id, skipping the first offset Artists. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_artists_keyset_page(self, limit: int, after: int = None, before: int = None) -> list:
+        """ Returns at most limit Artists ordered by artist id: the first ones with an id above after, or the last
+        ones with an id below before when before is given. """
         raise NotImplementedError
     
     @abc.abstractmethod
@@ -76,6 +117,18 @@ class AbstractRepository(abc.ABC):
 
     @abc.abstractmethod
     def get_genres(self) -> Genre:
+        """ Returns every Genre ordered by genre id. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_genres_page(self, offset: int, limit: int) -> list:
+        """ Returns at most limit Genres ordered by genre id, skipping the first offset Genres. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_genres_keyset_page(self, limit: int, after: int = None, before: int = None) -> list:
+        """ Returns at most limit Genres ordered by genre id: the first ones with an id above after, or the last
+        ones with an id below before when before is given. """
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -84,6 +137,18 @@ class AbstractRepository(abc.ABC):
 
     @abc.abstractmethod
     def get_albums(self):
+        """ Returns every Album ordered by album id. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_albums_page(self, offset: int, limit: int) -> list:
+        """ Returns at most limit Albums ordered by album id, skipping the first offset Albums. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_albums_keyset_page(self, limit: int, after: int = None, before: int = None) -> list:
+        """ Returns at most limit Albums ordered by album id: the first ones with an id above after, or the last
+        ones with an id below before when before is given. """
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -91,7 +156,16 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_reviews(self):
+    def get_reviews(self, track: Track):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_reviews_page(self, track: Track, offset: int, limit: int = None) -> list:
+        """ Returns up to limit reviews of the track after skipping offset, newest first. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_number_of_reviews(self, track: Track) -> int:
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -102,10 +176,19 @@ class AbstractRepository(abc.ABC):
     def get_playlist(self, playlist_id: int):
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_playlist_by_name(self, name: str):
+        """ Returns the PlayList whose normalized name equals the normalized name, or None. """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_playlists(self):
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_number_of_playlists(self):
+        raise NotImplementedError
+
     @abc.abstractmethod
     def add_track_to_playlist(self, playlist_id: int, track_id: int):
         raise NotImplementedError
@@ -6,7 +6,7 @@ from music.adapters.csvdatareader import TrackCSVReader
 
 
 
-def populate(data_path: Path, repo: AbstractRepository, test_mode: bool):
+def populate(data_path: Path, repo: AbstractRepository, test_mode: bool, bulk: bool = False):
     # Load articles and tags into the repository.
     if test_mode:
         print('test mode')
@@ -17,10 +17,16 @@ def populate(data_path: Path, repo: AbstractRepository, test_mode: bool):
         tracks_filename = str(Path(data_path) / "raw_tracks_excerpt.csv")
 
     csvreader = TrackCSVReader(albums_filename, tracks_filename)
-    csvreader.read_csv_files()
-    repo.load_artists(csvreader.dataset_of_artists)
-    repo.load_tracks(csvreader.dataset_of_tracks)
-    repo.load_albums(csvreader.dataset_of_albums)
+    if bulk:
+        # Artists, albums and genres all hang off the tracks, so the bulk load inserts them in the same batches
+        # while the csv rows are streamed in.
+        repo.bulk_load_tracks(csvreader.iter_tracks())
+        repo.rebuild_search_index()
+    else:
+        csvreader.read_csv_files()
+        repo.load_artists(csvreader.dataset_of_artists)
+        repo.load_tracks(csvreader.dataset_of_tracks)
+        repo.load_albums(csvreader.dataset_of_albums)
 
-    repo.load_genres(csvreader.dataset_of_genres)
+        repo.load_genres(csvreader.dataset_of_genres)
     repo.load_playlists()
\ No newline at end of file
@@ -0,0 +1,124 @@
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+from music.domainmodel.track import Track
+
+
+def searchable_fields(track: Track) -> list:
+    # The lowercased texts a search query is matched against: title, artist, album and genre names.
+    fields = []
+    if track.title is not None:
+        fields.append(track.title.lower())
+    if track.artist is not None and track.artist.full_name is not None:
+        fields.append(track.artist.full_name.lower())
+    if track.album is not None and track.album.title is not None:
+        fields.append(track.album.title.lower())
+    for genre in track.genres:
+        if genre.name is not None:
+            fields.append(genre.name.lower())
+    return fields
+
+
+def track_matches(track: Track, query: str) -> bool:
+    return any(query in field for field in searchable_fields(track))
+
+
+class TrackSearchIndex:
+    """ Inverted trigram index from the searchable fields to the ids of the tracks containing them.
+
+    Each posting list is a sorted array of track ids. Fields shorter than a trigram are indexed whole. A
+    three character query is answered exactly by its posting list, and a shorter one by the union of the
+    posting lists whose key contains it, found by scanning the keys. Longer queries intersect the posting
+    lists of their trigrams and the resulting candidates are verified with a plain substring test.
+    """
+
+    GRAM_SIZE = 3
+
+    def __init__(self):
+        self.__postings = dict()
+
+    @classmethod
+    def __grams(cls, track: Track) -> set:
+        n = cls.GRAM_SIZE
+        grams = set()
+        for field in searchable_fields(track):
+            if len(field) < n:
+                grams.add(field)
+            else:
+                grams.update(field[start:start + n] for start in range(len(field) - n + 1))
+        return grams
+
+    def add_track(self, track: Track):
+        track_id = track.track_id
+        for gram in self.__grams(track):
+            posting = self.__postings.get(gram)
+            if posting is None:
+                self.__postings[gram] = array('q', (track_id,))
+                continue
+            # Tracks mostly arrive in id order, so this is usually an append.
+            position = bisect_left(posting, track_id)
+            if position == len(posting) or posting[position] != track_id:
+                posting.insert(position, track_id)
+
+    def add_tracks(self, tracks):
+        postings = defaultdict(set)
+        for track in tracks:
+            for gram in self.__grams(track):
+                postings[gram].add(track.track_id)
+        for gram, track_ids in postings.items():
+            if gram in self.__postings:
+                track_ids.update(self.__postings[gram])
+            self.__postings[gram] = array('q', sorted(track_ids))
+
+    def remove_track(self, track: Track):
+        """ Drops the postings made for track, as indexed with its current field values. """
+        track_id = track.track_id
+        for gram in self.__grams(track):
+            posting = self.__postings.get(gram)
+            if posting is None:
+                continue
+            position = bisect_left(posting, track_id)
+            if position < len(posting) and posting[position] == track_id:
+                del posting[position]
+                if not posting:
+                    del self.__postings[gram]
+
+    def clear(self):
+        self.__postings.clear()
+
+    def is_exact(self, query: str) -> bool:
+        """ Returns True when candidates(query) needs no further verification. """
+        return len(query) <= self.GRAM_SIZE
+
+    def candidates(self, query: str) -> list:
+        """ Returns the sorted ids of tracks that may contain query; query must already be lowercased. """
+        n = self.GRAM_SIZE
+        if len(query) == n:
+            return list(self.__postings.get(query, ()))
+        if len(query) < n:
+            track_ids = set()
+            for gram, posting in self.__postings.items():
+                if query in gram:
+                    track_ids.update(posting)
+            return sorted(track_ids)
+
+        postings = []
+        for gram in {query[start:start + n] for start in range(len(query) - n + 1)}:
+            posting = self.__postings.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+
+        postings.sort(key=len)
+        result = list(postings[0])
+        for posting in postings[1:]:
+            result = [track_id for track_id in result if contains(posting, track_id)]
+            if not result:
+                break
+        return result
+
+
+def contains(posting: array, track_id: int) -> bool:
+    position = bisect_left(posting, track_id)
+    return position < len(posting) and posting[position] == track_id
@@ -0,0 +1,212 @@
+from array import array
+from bisect import bisect_left
+from typing import List
+
+from music.domainmodel.track import Track
+
+# Stands for a missing duration, artist or album in the integer columns; real values are never negative.
+NO_VALUE = -1
+
+
+class ObjectTrackStore:
+    """ Keeps every Track object in a list sorted by track id, next to an id-keyed index. """
+
+    def __init__(self):
+        self.__tracks = []
+        self.__track_ids = []
+        self.__track_index = dict()
+
+    def load(self, tracks: List[Track]):
+        """ Replaces the stored tracks with tracks, kept sorted by track id. As with add, a later track replaces
+        an earlier one with the same id. """
+        self.__track_index = {track.track_id: track for track in tracks}
+        self.__track_ids = sorted(self.__track_index)
+        self.__tracks = [self.__track_index[track_id] for track_id in self.__track_ids]
+
+    def add(self, track: Track):
+        position = bisect_left(self.__track_ids, track.track_id)
+        if track.track_id in self.__track_index:
+            self.__tracks[position] = track
+        else:
+            self.__tracks.insert(position, track)
+            self.__track_ids.insert(position, track.track_id)
+        self.__track_index[track.track_id] = track
+
+    def get(self, track_id: int) -> Track:
+        return self.__track_index.get(track_id)
+
+    def position(self, track_id: int) -> int:
+        """ Returns the position of the track in id order, or raises ValueError. """
+        if track_id not in self.__track_index:
+            raise ValueError
+        return bisect_left(self.__track_ids, track_id)
+
+    @property
+    def track_ids(self) -> list:
+        return self.__track_ids
+
+    def tracks(self) -> list:
+        return self.__tracks
+
+    def __getitem__(self, position):
+        return self.__tracks[position]
+
+    def __contains__(self, track_id: int) -> bool:
+        return track_id in self.__track_index
+
+    def __len__(self) -> int:
+        return len(self.__tracks)
+
+
+class PackedStrings:
+    """ Append-only table of optional strings packed into a single UTF-8 buffer of at most 4 GiB.
+
+    With a prefix_separator, the part of each string up to its last separator is kept once in a table of
+    prefixes and only the remainder is packed, which suits URLs that share a directory.
+    """
+
+    def __init__(self, prefix_separator: str = None):
+        self.__separator = prefix_separator
+        self.__data = bytearray()
+        self.__ends = array('I')
+        self.__nones = set()
+        self.__prefixes = []
+        self.__prefix_ids = dict()
+        self.__prefix_refs = array('I')
+
+    def append(self, value: str):
+        if value is None:
+            self.__nones.add(len(self.__ends))
+            value = ''
+        if self.__separator is not None:
+            prefix, separator, value = value.rpartition(self.__separator)
+            prefix += separator
+            if prefix not in self.__prefix_ids:
+                self.__prefix_ids[prefix] = len(self.__prefixes)
+                self.__prefixes.append(prefix)
+            self.__prefix_refs.append(self.__prefix_ids[prefix])
+        self.__data += value.encode('utf-8', 'surrogatepass')
+        self.__ends.append(len(self.__data))
+
+    def __getitem__(self, index: int) -> str:
+        if index in self.__nones:
+            return None
+        start = self.__ends[index - 1] if index > 0 else 0
+        value = self.__data[start:self.__ends[index]].decode('utf-8', 'surrogatepass')
+        if self.__separator is not None:
+            value = self.__prefixes[self.__prefix_refs[index]] + value
+        return value
+
+    def __len__(self) -> int:
+        return len(self.__ends)
+
+
+class ColumnarTrackStore:
+    """ Keeps tracks as columns of machine integers and packed strings instead of Track objects.
+
+    Rows are appended in arrival order: durations, artist and album ids in array columns, titles and URLs
+    in packed string tables, and genre ids in a flat array delimited by per-row offsets. The sorted track
+    ids, each next to the row holding it, give the track id order. Track objects are built on demand from
+    a row, so each lookup returns a new Track; changes to it are not written back. Artists, albums and
+    genres are few and are shared between the views as before.
+    """
+
+    def __init__(self):
+        self.__clear()
+
+    def __clear(self):
+        self.__durations = array('q')
+        self.__artist_ids = array('q')
+        self.__album_ids = array('q')
+        self.__titles = PackedStrings()
+        self.__urls = PackedStrings(prefix_separator='/')
+        self.__genre_offsets = array('I', [0])
+        self.__genre_ids = array('q')
+        self.__sorted_ids = array('q')
+        self.__rows = array('I')
+        self.__artists = dict()
+        self.__albums = dict()
+        self.__genres = dict()
+
+    def load(self, tracks: List[Track]):
+        """ Replaces the stored tracks with tracks, kept sorted by track id. As with add, a later track replaces
+        an earlier one with the same id. """
+        self.__clear()
+        for track in tracks:
+            self.add(track)
+
+    def add(self, track: Track):
+        row = len(self.__durations)
+        self.__durations.append(NO_VALUE if track.track_duration is None else track.track_duration)
+        self.__artist_ids.append(self.__reference(self.__artists, track.artist, 'artist_id'))
+        self.__album_ids.append(self.__reference(self.__albums, track.album, 'album_id'))
+        self.__titles.append(track.title)
+        self.__urls.append(track.track_url)
+        for genre in track.genres:
+            self.__genre_ids.append(self.__reference(self.__genres, genre, 'genre_id'))
+        self.__genre_offsets.append(len(self.__genre_ids))
+
+        position = bisect_left(self.__sorted_ids, track.track_id)
+        if position < len(self.__sorted_ids) and self.__sorted_ids[position] == track.track_id:
+            # The newer row replaces the stored one; the old row is left unreferenced.
+            self.__rows[position] = row
+        else:
+            self.__sorted_ids.insert(position, track.track_id)
+            self.__rows.insert(position, row)
+
+    @staticmethod
+    def __reference(objects: dict, owner, id_name: str) -> int:
+        if owner is None:
+            return NO_VALUE
+        owner_id = getattr(owner, id_name)
+        objects.setdefault(owner_id, owner)
+        if hasattr(owner, 'tracks'):
+            # The repository finds an artist's or album's tracks through its id posting lists; the back
+            # references would keep every parsed Track alive.
+            owner.tracks.clear()
+        return owner_id
+
+    def __track(self, track_id: int, row: int) -> Track:
+        # The columns were filled from valid Tracks, so the view skips the setters' checks.
+        duration = self.__durations[row]
+        genre_ids = self.__genre_ids[self.__genre_offsets[row]:self.__genre_offsets[row + 1]]
+        return Track.from_trusted(
+            track_id, self.__titles[row], artist=self.__artists.get(self.__artist_ids[row]),
+            album=self.__albums.get(self.__album_ids[row]), track_url=self.__urls[row],
+            track_duration=None if duration == NO_VALUE else duration,
+            genres=[self.__genres[genre_id] for genre_id in genre_ids])
+
+    def get(self, track_id: int) -> Track:
+        position = bisect_left(self.__sorted_ids, track_id)
+        if position < len(self.__sorted_ids) and self.__sorted_ids[position] == track_id:
+            return self.__track(track_id, self.__rows[position])
+        return None
+
+    def position(self, track_id: int) -> int:
+        """ Returns the position of the track in id order, or raises ValueError. """
+        position = bisect_left(self.__sorted_ids, track_id)
+        if position < len(self.__sorted_ids) and self.__sorted_ids[position] == track_id:
+            return position
+        raise ValueError
+
+    @property
+    def track_ids(self) -> array:
+        return self.__sorted_ids
+
+    def tracks(self) -> list:
+        return list(map(self.__track, self.__sorted_ids, self.__rows))
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return list(map(self.__track, self.__sorted_ids[position], self.__rows[position]))
+        return self.__track(self.__sorted_ids[position], self.__rows[position])
+
+    def __contains__(self, track_id: int) -> bool:
+        position = bisect_left(self.__sorted_ids, track_id)
+        return position < len(self.__sorted_ids) and self.__sorted_ids[position] == track_id
+
+    def __len__(self) -> int:
+        return len(self.__sorted_ids)
+
+
+TRACK_STORES = {'objects': ObjectTrackStore, 'columnar': ColumnarTrackStore}
@@ -15,6 +15,25 @@ class Album:
         self.__release_year: int | None = None
         self.__tracks = []
 
+    @classmethod
+    def from_trusted(cls, album_id: int, title: str, album_url: str = None, album_type: str = None,
+                     release_year: int = None) -> 'Album':
+        """ Builds an Album from values that already passed validation, assigning them as given. """
+        if '_sa_class_manager' in cls.__dict__:
+            album = cls(album_id, title)
+            album.album_url = album_url
+            album.album_type = album_type
+            album.release_year = release_year
+            return album
+        album = cls.__new__(cls)
+        album.__album_id = album_id
+        album.__title = title
+        album.__album_url = album_url
+        album.__album_type = album_type
+        album.__release_year = release_year
+        album.__tracks = []
+        return album
+
     @property
     def album_id(self) -> int:
         return self.__album_id
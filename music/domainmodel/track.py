@@ -21,6 +21,36 @@ class Track:
         self.__genres: list = []
         self.__reviews = []
 
+    @classmethod
+    def from_trusted(cls, track_id: int, title: str, artist: Artist = None, album: Album = None,
+                     track_url: str = None, track_duration: int = None, genres: list = ()) -> 'Track':
+        """ Builds a Track from values that already passed validation, such as those of a stored Track.
+
+        The values are assigned as given: the title and url must already be stripped, the duration must be a
+        non negative int or None and genres must not repeat.
+        """
+        if '_sa_class_manager' in cls.__dict__:
+            # Mapped classes track their attributes through SQLAlchemy, so take the regular path.
+            track = cls(track_id, title)
+            track.artist = artist
+            track.album = album
+            track.track_url = track_url
+            if track_duration is not None:
+                track.track_duration = track_duration
+            for genre in genres:
+                track.add_genre(genre)
+            return track
+        track = cls.__new__(cls)
+        track.__track_id = track_id
+        track.__title = title
+        track.__artist = artist
+        track.__album = album
+        track.__track_url = track_url
+        track.__track_duration = track_duration
+        track.__genres = list(genres)
+        track.__reviews = []
+        return track
+
     @property
     def track_id(self) -> int:
         return self.__track_id
@@ -10,7 +10,6 @@ from music.domainmodel.genre import Genre
 from music.domainmodel.user import User
 from music.domainmodel.review import Review
 from music.domainmodel.playlist import PlayList
-import random
 
 
 class NonExistentTrackException(Exception):
@@ -41,6 +40,21 @@ def get_tracks(repo: AbstractRepository):
     return tracks_to_dict(tracks)
 
 
+def get_tracks_page(offset: int, limit: int, repo: AbstractRepository):
+    # Only the tracks on the requested page are fetched and converted.
+    tracks = repo.get_tracks_page(offset, limit)
+    if tracks is None:
+        raise NonExistentTrackException
+    return tracks_to_dict(tracks)
+
+
+def get_tracks_keyset_page(limit: int, repo: AbstractRepository, after: int = None, before: int = None):
+    tracks = repo.get_tracks_keyset_page(limit, after, before)
+    if tracks is None:
+        raise NonExistentTrackException
+    return tracks_to_dict(tracks)
+
+
 def get_number_of_tracks(repo: AbstractRepository):
     length = repo.get_number_of_tracks()
     return length
@@ -82,14 +96,22 @@ def add_review(track_id: int, review_text: str, review_rating: int, repo: Abstra
     repo.add_review(review)
 
 
-def get_reviews(track_id: int, repo: AbstractRepository):
+def get_reviews(track_id: int, repo: AbstractRepository, offset: int = 0, limit: int = None):
+    # Newest reviews first; only the requested page is fetched from the repository.
     track = repo.get_track(track_id)
     if track == None:
         raise NonExistentTrackException
-    reviews = repo.get_reviews(track)
+    reviews = repo.get_reviews_page(track, offset, limit)
     return reviews
 
 
+def get_number_of_reviews(track_id: int, repo: AbstractRepository):
+    track = repo.get_track(track_id)
+    if track == None:
+        raise NonExistentTrackException
+    return repo.get_number_of_reviews(track)
+
+
 def get_artists(repo: AbstractRepository):
     artists = repo.get_artists()
     return artists
@@ -100,6 +122,30 @@ def get_genres(repo: AbstractRepository):
     return genres
 
 
+def get_artists_page(offset: int, limit: int, repo: AbstractRepository):
+    return repo.get_artists_page(offset, limit)
+
+
+def get_genres_page(offset: int, limit: int, repo: AbstractRepository):
+    return repo.get_genres_page(offset, limit)
+
+
+def get_albums_page(offset: int, limit: int, repo: AbstractRepository):
+    return repo.get_albums_page(offset, limit)
+
+
+def get_artists_keyset_page(limit: int, repo: AbstractRepository, after: int = None, before: int = None):
+    return repo.get_artists_keyset_page(limit, after, before)
+
+
+def get_genres_keyset_page(limit: int, repo: AbstractRepository, after: int = None, before: int = None):
+    return repo.get_genres_keyset_page(limit, after, before)
+
+
+def get_albums_keyset_page(limit: int, repo: AbstractRepository, after: int = None, before: int = None):
+    return repo.get_albums_keyset_page(limit, after, before)
+
+
 def get_albums(repo: AbstractRepository):
     albums = repo.get_albums()
     return albums
@@ -123,11 +169,9 @@ def tracks_to_dict(tracks: Iterable[Track]):
 
 
 def add_playlist(playlist_name: str, repo: AbstractRepository):
-    playlists = repo.get_playlists()
-    for p in playlists:
-        if p.name == playlist_name:
-            raise TitleNotUnique
-    id = len(repo.get_playlists())
+    if repo.get_playlist_by_name(playlist_name) is not None:
+        raise TitleNotUnique
+    id = repo.get_number_of_playlists()
     playlist = PlayList(id, playlist_name)
     repo.add_playlist(playlist)
 
@@ -160,36 +204,5 @@ def get_number_of_albums(repo: AbstractRepository):
     return length
 
 
-def get_genres(repo: AbstractRepository):
-    genres = repo.get_genres()
-    genres_list = []
-    if genres is None:
-        raise NonExistentTrackException
-    for genre in genres:
-        genres_list.append(genre)
-    genres_list.sort()
-    return genres_list
-
-
-def get_albums(repo: AbstractRepository):
-    albums = repo.get_albums()
-    albums_list = []
-    if albums is None:
-        raise NonExistentTrackException
-    for album in albums:
-        albums_list.append(album)
-    albums_list.sort()
-    return albums_list
-
-
-def get_random_tracks(repo: AbstractRepository):
-    tracks = repo.get_tracks()
-    length = len(tracks)
-    random_index_list = []
-    for i in range(5):
-        random_index = random.randint(1, 5)
-        random_index_list.append(random_index)
-    random_tracks = []
-    for index in random_index_list:
-        random_tracks.append(tracks[index])
-    return random_tracks
+def get_random_tracks(repo: AbstractRepository, quantity: int = 5):
+    return repo.sample_tracks(quantity)
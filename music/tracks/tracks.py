@@ -20,29 +20,12 @@ tracks_blueprint = Blueprint(
 @tracks_blueprint.route('/tracks', methods=['GET', 'POST'])
 def get_tracks():
     tracks_per_page = 15
-    cursor = request.args.get('cursor')
-    if cursor is None:
-        # No cursor query parameter, so initialise cursor to start at the beginning.
-        cursor = 0
-    else:
-        # Convert cursor from string to int.
-        cursor = int(cursor)
-
-    n = tracks_services.get_number_of_tracks(repo.repo_instance)
-    tracks = tracks_services.get_tracks(repo.repo_instance)[cursor:cursor + tracks_per_page]
+    tracks, prev_page_url, next_page_url = keyset_page(
+        'tracks_bp.get_tracks', tracks_services.get_tracks_keyset_page, tracks_per_page, lambda t: t['track_id'])
     for t in tracks:
         t['add_review_url'] = url_for('tracks_bp.review', track=t['track_id'])
         t['add_to_playlist_url'] = url_for('tracks_bp.add_to_playlist', track=t['track_id'])
 
-    next_page_url = None
-    prev_page_url = None
-
-    if cursor > 0:
-        prev_page_url = url_for('tracks_bp.get_tracks', cursor=cursor - tracks_per_page)
-
-    if cursor + tracks_per_page < n:
-        next_page_url = url_for('tracks_bp.get_tracks', cursor=cursor + tracks_per_page)
-
     return render_template('tracks/tracks.html', tracks=tracks, subheader="Browse", form=None,
                            next_page_url=next_page_url, prev_page_url=prev_page_url,
                            selected_tracks=get_random_tracks(), playlist_id=None)
@@ -98,9 +81,28 @@ def review():
     else:
         track_id = int(form.track_id.data)
 
+    reviews_per_page = 10
+    cursor = request.args.get('cursor')
+    if cursor is None:
+        cursor = 0
+    else:
+        cursor = int(cursor)
+
     track = tracks_services.get_track_by_id(track_id, repo.repo_instance)
-    reviews = tracks_services.get_reviews(track_id, repo.repo_instance)
+    n = tracks_services.get_number_of_reviews(track_id, repo.repo_instance)
+    reviews = tracks_services.get_reviews(track_id, repo.repo_instance, cursor, reviews_per_page)
+
+    next_page_url = None
+    prev_page_url = None
+
+    if cursor > 0:
+        prev_page_url = url_for('tracks_bp.review', track=track_id, cursor=max(cursor - reviews_per_page, 0))
+
+    if cursor + reviews_per_page < n:
+        next_page_url = url_for('tracks_bp.review', track=track_id, cursor=cursor + reviews_per_page)
+
     return render_template('tracks/review.html', form=form, track=track, reviews=reviews,
+                           next_page_url=next_page_url, prev_page_url=prev_page_url,
                            handler_url=url_for('tracks_bp.review'), selected_tracks=get_random_tracks(), playlist_id=None)
 
 
@@ -177,26 +179,8 @@ def create_playlist():
 @tracks_blueprint.route('/artists',methods=['GET'])
 def get_artists():
     artists_per_page = 20
-    cursor = request.args.get('cursor')
-    if cursor is None:
-        # No cursor query parameter, so initialise cursor to start at the beginning.
-        cursor = 0
-    else:
-        # Convert cursor from string to int.
-        cursor = int(cursor)
-
-    artists = list(tracks_services.get_artists(repo.repo_instance))[cursor:cursor + artists_per_page]
-    n = len(tracks_services.get_artists(repo.repo_instance))
-
-    next_page_url = None
-    prev_page_url = None
-
-    if cursor > 0:
-        prev_page_url = url_for('tracks_bp.get_artists', cursor=cursor - artists_per_page)
-
-    if cursor + artists_per_page < n:
-        next_page_url = url_for('tracks_bp.get_artists', cursor=cursor + artists_per_page)
-
+    artists, prev_page_url, next_page_url = keyset_page(
+        'tracks_bp.get_artists', tracks_services.get_artists_keyset_page, artists_per_page, lambda a: a.artist_id)
 
     return render_template('tracks/artists.html', artists=artists, subheader = "Browse", next_page_url=next_page_url, prev_page_url=prev_page_url)
 
@@ -215,22 +199,8 @@ def get_track_by_id(track_id):
 @tracks_blueprint.route('/genres', methods=['GET'])
 def get_genres():
     genres_per_page = 20
-    cursor = request.args.get('cursor')
-    if cursor is None:
-        cursor = 0
-    else:
-        cursor = int(cursor)
-    n = tracks_services.get_number_of_genres(repo.repo_instance)
-    genres = tracks_services.get_genres(repo.repo_instance)[cursor:cursor + genres_per_page]
-
-    next_page_url = None
-    prev_page_url = None
-
-    if cursor > 0:
-        prev_page_url = url_for('tracks_bp.get_genres', cursor=cursor - genres_per_page)
-
-    if cursor + genres_per_page < n:
-        next_page_url = url_for('tracks_bp.get_genres', cursor=cursor + genres_per_page)
+    genres, prev_page_url, next_page_url = keyset_page(
+        'tracks_bp.get_genres', tracks_services.get_genres_keyset_page, genres_per_page, lambda g: g.genre_id)
 
     return render_template('tracks/genres.html', genres=genres, subheader="Genres for You", form=None,
                            next_page_url=next_page_url, prev_page_url=prev_page_url,
@@ -240,25 +210,36 @@ def get_genres():
 @tracks_blueprint.route('/albums', methods=['GET'])
 def get_albums():
     albums_per_page = 20
-    cursor = request.args.get('cursor')
-    if cursor is None:
-        cursor = 0
-    else:
-        cursor = int(cursor)
-    n = tracks_services.get_number_of_albums(repo.repo_instance)
-    albums = tracks_services.get_albums(repo.repo_instance)[cursor:cursor + albums_per_page]
-    next_page_url = None
-    prev_page_url = None
-    if cursor > 0:
-        prev_page_url = url_for('tracks_bp.get_albums', cursor=cursor - albums_per_page)
-
-    if cursor + albums_per_page < n:
-        next_page_url = url_for('tracks_bp.get_albums', cursor=cursor + albums_per_page)
+    albums, prev_page_url, next_page_url = keyset_page(
+        'tracks_bp.get_albums', tracks_services.get_albums_keyset_page, albums_per_page, lambda a: a.album_id)
 
     return render_template('tracks/albums.html', albums=albums, subheader="Albums for You", form=None,
                            next_page_url=next_page_url, prev_page_url=prev_page_url,
                            selected_tracks=get_random_tracks())
 
+def keyset_page(endpoint, get_page, per_page, key):
+    # Pages are addressed by the id next to them (?after= or ?before=) rather than by position, so a page stays
+    # put when the catalogue changes. One extra item tells whether there is a page beyond in that direction.
+    after = request.args.get('after', type=int)
+    before = request.args.get('before', type=int)
+    if before is not None:
+        items = get_page(per_page + 1, repo.repo_instance, before=before)
+        has_prev, has_next = len(items) > per_page, True
+        items = items[-per_page:]
+    else:
+        items = get_page(per_page + 1, repo.repo_instance, after=after)
+        has_prev, has_next = after is not None, len(items) > per_page
+        items = items[:per_page]
+
+    prev_page_url = None
+    next_page_url = None
+    if has_prev and items:
+        prev_page_url = url_for(endpoint, before=key(items[0]))
+    if has_next and items:
+        next_page_url = url_for(endpoint, after=key(items[-1]))
+    return items, prev_page_url, next_page_url
+
+
 def get_random_tracks():
     tracks = tracks_services.get_random_tracks(repo.repo_instance)
     return tracks
\ No newline at end of file
@@ -18,7 +18,7 @@ TEST_DATA_PATH = get_project_root() / "data"
 @pytest.fixture
 def in_memory_repo():
     repo = MemoryRepository()
-    memory_repository.populate(TEST_DATA_PATH, repo)
+    memory_repository.populate(TEST_DATA_PATH, repo, use_cache=False)
     return repo
 
 
@@ -1,3 +1,5 @@
+import re
+
 import pytest
 
 from flask import session
@@ -99,6 +101,24 @@ def test_can_get_albums(client):
     response = client.get('/albums')
     assert response.status_code == 200
 
+def test_genre_pages_link_by_genre_id(client):
+    urls = []
+    url = '/genres'
+    while url is not None:
+        response = client.get(url)
+        assert response.status_code == 200
+        urls.append(url)
+        match = re.search(rb"location.href='(/genres\?after=\d+)'", response.data)
+        url = match.group(1).decode() if match else None
+    assert len(urls) == 3
+
+    response = client.get(urls[-1])
+    match = re.search(rb"location.href='(/genres\?before=\d+)'", response.data)
+    assert match is not None
+    # Going back from the last page lands on the previous one, whose next link leads to the last page again.
+    response = client.get(match.group(1).decode())
+    assert f"location.href='{urls[-1]}'".encode() in response.data
+
 def test_can_create_random_playlist(client):
     response = client.get('/create_random_playlist')
     assert response.status_code == 302
@@ -0,0 +1,103 @@
+import pytest
+
+from music.adapters.caching_repository import CachingRepository, unwrap_repository
+from music.domainmodel.genre import Genre
+from music.domainmodel.playlist import PlayList
+from music.domainmodel.review import Review
+from music.domainmodel.track import Track
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def caching_repo(in_memory_repo, clock):
+    return CachingRepository(in_memory_repo, max_entries=8, ttl=10, clock=clock)
+
+
+def test_reads_are_served_from_the_cache(caching_repo, in_memory_repo):
+    assert caching_repo.get_number_of_tracks() == in_memory_repo.get_number_of_tracks()
+    assert caching_repo.get_genres_keyset_page(20, 5) is caching_repo.get_genres_keyset_page(20, 5)
+    caching_repo.get_number_of_tracks()
+    assert (caching_repo.hits, caching_repo.misses) == (2, 2)
+    assert caching_repo.cache_info().entries == 2
+
+
+def test_entries_expire_after_ttl(caching_repo, clock):
+    caching_repo.get_number_of_albums()
+    clock.now = 9.9
+    caching_repo.get_number_of_albums()
+    clock.now = 10
+    caching_repo.get_number_of_albums()
+    assert (caching_repo.hits, caching_repo.misses) == (1, 2)
+
+
+def test_least_recently_used_entries_are_evicted(caching_repo):
+    for offset in range(8):
+        caching_repo.get_tracks_page(offset, 15)
+    caching_repo.get_tracks_page(0, 15)
+    caching_repo.get_tracks_page(8, 15)
+    assert caching_repo.cache_info().entries == 8
+
+    caching_repo.get_tracks_page(0, 15)
+    caching_repo.get_tracks_page(1, 15)
+    assert (caching_repo.hits, caching_repo.misses) == (2, 10)
+
+
+def test_writes_invalidate_affected_reads(caching_repo):
+    number_of_tracks = caching_repo.get_number_of_tracks()
+    number_of_genres = caching_repo.get_number_of_genres()
+    number_of_playlists = caching_repo.get_number_of_playlists()
+    track = caching_repo.get_track(2)
+    other_track = caching_repo.get_track(3)
+    caching_repo.get_number_of_reviews(track)
+    caching_repo.get_number_of_reviews(other_track)
+
+    caching_repo.add_track(Track(1, 'Test song'))
+    caching_repo.add_genre(Genre(1300, 'Chinese Style'))
+    caching_repo.add_playlist(PlayList(99, 'New playlist'))
+    caching_repo.add_review(Review(track, 'Nice', 5))
+
+    assert caching_repo.get_number_of_tracks() == number_of_tracks + 1
+    assert caching_repo.get_number_of_genres() == number_of_genres + 1
+    assert caching_repo.get_number_of_playlists() == number_of_playlists + 1
+    assert caching_repo.get_number_of_reviews(track) == 1
+    hits = caching_repo.hits
+    assert caching_repo.get_number_of_reviews(other_track) == 0
+    assert caching_repo.hits == hits + 1
+
+
+def test_reads_overlapping_a_write_are_not_cached(caching_repo, in_memory_repo, monkeypatch):
+    count_tracks = in_memory_repo.get_number_of_tracks
+
+    def count_while_a_track_is_added():
+        number_of_tracks = count_tracks()
+        caching_repo.add_track(Track(1, 'Test song'))
+        return number_of_tracks
+    monkeypatch.setattr(in_memory_repo, 'get_number_of_tracks', count_while_a_track_is_added)
+    assert caching_repo.get_number_of_tracks() == 2000
+    monkeypatch.setattr(in_memory_repo, 'get_number_of_tracks', count_tracks)
+
+    assert caching_repo.get_number_of_tracks() == 2001
+    assert caching_repo.cache_info().entries == 1
+
+
+def test_other_attributes_reach_the_wrapped_repository(caching_repo, in_memory_repo):
+    assert caching_repo.get_artist(1) is in_memory_repo.get_artist(1)
+    assert unwrap_repository(CachingRepository(caching_repo)) is in_memory_repo
+    assert unwrap_repository(in_memory_repo) is in_memory_repo
+
+
+def test_invalid_bounds_are_rejected(in_memory_repo):
+    with pytest.raises(ValueError):
+        CachingRepository(in_memory_repo, max_entries=0)
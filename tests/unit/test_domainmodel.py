@@ -8,7 +8,7 @@ from music.domainmodel.review import Review
 from music.domainmodel.album import Album
 from music.domainmodel.user import User
 from music.domainmodel.playlist import PlayList 
-from music.adapters.csvdatareader import TrackCSVReader
+from music.adapters.csvdatareader import TrackCSVReader, extract_genres, parse_genre_list, split_records
 
 class TestPlayList:
     def test_construction(self):
@@ -300,6 +300,23 @@ class TestAlbum:
 
 class TestTrack:
 
+    def test_from_trusted(self):
+        artist = Artist(2, 'AWOL')
+        album = Album(1, 'A Way Of Life')
+        genre = Genre(21, 'Hip-Hop')
+        track = Track.from_trusted(2, 'Food', artist=artist, album=album, track_url='http://fma/Food',
+                                   track_duration=168, genres=[genre])
+
+        assert track == Track(2, 'Food')
+        assert (track.title, track.artist, track.album, track.track_url, track.track_duration) == \
+               ('Food', artist, album, 'http://fma/Food', 168)
+        assert track.genres == [genre]
+        assert track.reviews == []
+        assert Track.from_trusted(3, None).track_duration is None
+        assert Album.from_trusted(1, 'A Way Of Life', release_year=2009).release_year == 2009
+        assert Artist.from_trusted(2, 'AWOL').full_name == 'AWOL'
+        assert Genre.from_trusted(21, 'Hip-Hop').name == 'Hip-Hop'
+
     def test_construction(self):
         track1 = Track(1, 'As it Was ')
         track2 = Track(2, ' Heat Waves')
@@ -681,11 +698,15 @@ class TestUser:
         assert user1.reviews == [review3]
 
 
-def create_csv_reader():
+def csv_file_names():
     dirname = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     albums_file_name = os.path.join(dirname, 'data/raw_albums_excerpt.csv')
     tracks_file_name = os.path.join(dirname, 'data/raw_tracks_excerpt.csv')
-    reader = TrackCSVReader(albums_file_name, tracks_file_name)
+    return albums_file_name, tracks_file_name
+
+
+def create_csv_reader():
+    reader = TrackCSVReader(*csv_file_names())
     reader.read_csv_files()
     return reader
 
@@ -751,3 +772,93 @@ class TestCSVReader:
         # genre id = 3>]'
         sorted_genre_sample = str(sorted_genres[:3])
         assert sorted_genre_sample == '[<Genre Avant-Garde, genre id = 1>, <Genre International, genre id = 2>, <Genre Blues, genre id = 3>]'
+
+    def test_iter_tracks_streams_linked_tracks(self):
+        reader = create_csv_reader()
+        streaming_reader = TrackCSVReader(*csv_file_names())
+        tracks = streaming_reader.iter_tracks()
+
+        first_track = next(tracks)
+        assert first_track == Track(2, 'Food')
+        assert first_track.artist.full_name == 'AWOL'
+        assert first_track.album.title == 'AWOL - A Way Of Life'
+
+        remaining_tracks = list(tracks)
+        assert [first_track] + remaining_tracks == reader.dataset_of_tracks
+        assert streaming_reader.dataset_of_artists == reader.dataset_of_artists
+        assert streaming_reader.dataset_of_albums == reader.dataset_of_albums
+        assert streaming_reader.dataset_of_genres == reader.dataset_of_genres
+
+    def test_iter_tracks_does_not_keep_yielded_tracks(self):
+        import gc
+        import weakref
+        streaming_reader = TrackCSVReader(*csv_file_names())
+        references = [weakref.ref(track) for track in streaming_reader.iter_tracks()]
+        gc.collect()
+        assert len(references) == 2000
+        assert all(reference() is None for reference in references)
+        assert all(artist.tracks == [] for artist in streaming_reader.dataset_of_artists)
+
+    def test_extract_genres_parses_and_falls_back(self):
+        row = {'track_genres': "[{'genre_id': '21', 'genre_title': 'Hip-Hop', 'genre_url': 'http://x/Hip-Hop/'}, "
+                               "{'genre_id': '5', 'genre_title': \"Children's\", 'genre_url': 'http://x/Childrens/'}]"}
+        assert parse_genre_list(row['track_genres']) is None
+        genres = extract_genres(row)
+        assert [(genre.genre_id, genre.name) for genre in genres] == [(21, 'Hip-Hop'), (5, "Children's")]
+        assert parse_genre_list("[{'genre_id': '1', 'genre_title': 'Avant-Garde', 'genre_url': 'u'}]") == [(1, 'Avant-Garde')]
+        assert parse_genre_list('[]') == []
+
+    def test_genres_are_interned_by_id(self):
+        reader = create_csv_reader()
+        genres_by_id = {}
+        for track in reader.dataset_of_tracks:
+            for genre in track.genres:
+                assert genres_by_id.setdefault(genre.genre_id, genre) is genre
+        assert len(genres_by_id) == 60
+
+    def test_artists_and_albums_are_interned_with_back_references(self):
+        reader = create_csv_reader()
+        artists_by_id = {}
+        albums_by_id = {}
+        for track in reader.dataset_of_tracks:
+            assert artists_by_id.setdefault(track.artist.artist_id, track.artist) is track.artist
+            if track.album is not None:
+                assert albums_by_id.setdefault(track.album.album_id, track.album) is track.album
+        assert len(artists_by_id) == 263
+
+        assert sum(len(artist.tracks) for artist in artists_by_id.values()) == 2000
+        for artist in artists_by_id.values():
+            assert all(track.artist is artist for track in artist.tracks)
+        for album in albums_by_id.values():
+            assert len(set(album.tracks)) == len(album.tracks)
+            assert all(track.album is album for track in album.tracks)
+
+    def test_projected_rows_match_dict_rows(self):
+        reader = TrackCSVReader(*csv_file_names())
+        projected_rows = list(reader.iter_projected_track_rows(('track_id', 'track_title', 'track_genres')))
+        dict_rows = reader.read_tracks_file()
+        assert projected_rows == [(row['track_id'], row['track_title'], row['track_genres']) for row in dict_rows]
+        assert list(reader.iter_projected_track_rows(('artist_name',)))[0] == ('AWOL',)
+
+    def test_parallel_reader_matches_serial_reader(self):
+        reader = create_csv_reader()
+        parallel_reader = TrackCSVReader(*csv_file_names())
+        parallel_reader.read_csv_files_parallel(processes=2)
+
+        def track_fields(track):
+            return (track.track_id, track.title, track.track_url, track.track_duration, track.artist.full_name,
+                    track.album, [(genre.genre_id, genre.name) for genre in track.genres])
+
+        assert [track_fields(track) for track in parallel_reader.dataset_of_tracks] == \
+               [track_fields(track) for track in reader.dataset_of_tracks]
+        assert parallel_reader.dataset_of_artists == reader.dataset_of_artists
+        assert parallel_reader.dataset_of_albums == reader.dataset_of_albums
+        assert parallel_reader.dataset_of_genres == reader.dataset_of_genres
+        assert [len(artist.tracks) for artist in sorted(parallel_reader.dataset_of_artists)] == \
+               [len(artist.tracks) for artist in sorted(reader.dataset_of_artists)]
+
+    def test_split_records_keeps_quoted_newlines_together(self):
+        data = b'id,title\n1,"multi\nline"\n2,escaped \\\n newline\n3,plain\n'
+        byte_ranges = split_records(data, 9, 10)
+        assert [data[start:end] for start, end in byte_ranges] == \
+               [b'1,"multi\nline"\n', b'2,escaped \\\n newline\n', b'3,plain\n']
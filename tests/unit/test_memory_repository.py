@@ -12,6 +12,8 @@ from music.domainmodel.genre import Genre
 from music.domainmodel.user import User
 from music.domainmodel.review import Review
 from music.domainmodel.playlist import PlayList
+from music.adapters.memory_repository import MemoryRepository
+from music.adapters.search_index import TrackSearchIndex
 
 
 def test_repository_can_add_a_user(in_memory_repo):
@@ -21,6 +23,13 @@ def test_repository_can_add_a_user(in_memory_repo):
     assert in_memory_repo.get_user('dave') is user
 
 
+def test_repository_can_retrieve_a_user_by_id(in_memory_repo):
+    user = User(3, 'fmercury', '8734gfe2058v')
+    in_memory_repo.add_user(user)
+    assert in_memory_repo.get_user_by_id(3) is user
+    assert in_memory_repo.get_user_by_id(4) is None
+
+
 def test_repository_can_retrieve_a_user(in_memory_repo):
     user = User(2, 'fmercury', '8734gfe2058v')
     in_memory_repo.add_user(user)
@@ -63,11 +72,49 @@ def test_repository_get_track_ids_by_genre(in_memory_repo):
     assert len(track_ids) == 31
 
 
+def test_secondary_indexes_match_scans(in_memory_repo):
+    tracks = in_memory_repo.get_tracks()
+    for artist in in_memory_repo.get_artists():
+        assert in_memory_repo.get_artist(artist.artist_id) is artist
+        assert in_memory_repo.get_tracks_by_artist(artist) == [track for track in tracks if track.artist == artist]
+    for album in in_memory_repo.get_albums():
+        assert in_memory_repo.get_album(album.album_id) is album
+        assert in_memory_repo.get_tracks_by_album(album) == [track for track in tracks if track.album == album]
+    for genre in in_memory_repo.get_genres():
+        assert in_memory_repo.get_genre(genre.genre_id) is genre
+        assert in_memory_repo.get_track_ids_by_genre(genre.name) == \
+               [track.track_id for track in tracks if genre.name in [g.name for g in track.genres]]
+
+
+def test_secondary_indexes_follow_added_entities(in_memory_repo):
+    artist = Artist(1701, 'artist1701')
+    album = Album(5000, 'Galway Girl')
+    track = Track(1, 'Test song')
+    track.artist = artist
+    track.album = album
+    track.add_genre(Genre(1300, 'Chinese Style'))
+    in_memory_repo.add_artist(artist)
+    in_memory_repo.add_album(album)
+    in_memory_repo.add_track(track)
+
+    assert in_memory_repo.get_artist(1701) is artist
+    assert in_memory_repo.get_album(5000) is album
+    assert in_memory_repo.get_tracks_by_artist(artist) == [track]
+    assert in_memory_repo.get_tracks_by_album(album) == [track]
+    assert in_memory_repo.get_track_ids_by_genre('Chinese Style') == [1]
+
+
 def test_repository_get_tracks_by_ids(in_memory_repo):
     tracks = in_memory_repo.get_tracks_by_ids([2, 3])
     assert len(tracks) == 2
 
 
+def test_get_tracks_by_ids_keeps_order_and_skips_missing_ids(in_memory_repo):
+    tracks = in_memory_repo.get_tracks_by_ids([144, 7, 2, 3])
+    assert [track.track_id for track in tracks] == [144, 2, 3]
+    assert tracks[0] is in_memory_repo.get_track(144)
+
+
 def test_search_tracks(in_memory_repo):
     album_input = 'amoebiasis'
     t1 = in_memory_repo.get_track(144)
@@ -76,6 +123,40 @@ def test_search_tracks(in_memory_repo):
     assert byalbum == [t1, t2]
 
 
+def test_search_tracks_matches_substring_scan(in_memory_repo):
+    for search_input in ['a', 'ro', 'hip', 'live at', 'amoebiasis', 'no such track']:
+        expected = [track for track in in_memory_repo.get_tracks()
+                    if search_input in track.title.lower()
+                    or (track.artist is not None and search_input in track.artist.full_name.lower())
+                    or (track.album is not None and search_input in track.album.title.lower())
+                    or any(search_input in genre.name.lower() for genre in track.genres)]
+        assert in_memory_repo.search_tracks(search_input) == expected
+
+
+def test_search_tracks_finds_added_track(in_memory_repo):
+    track = Track(1, 'Quokka Quickstep')
+    in_memory_repo.add_track(track)
+    assert in_memory_repo.search_tracks('quokka') == [track]
+
+
+def test_search_tracks_finds_fields_shorter_than_a_trigram(in_memory_repo):
+    track = Track(1, 'Go')
+    in_memory_repo.add_track(track)
+    assert track in in_memory_repo.search_tracks('go')
+    assert track in in_memory_repo.search_tracks('o')
+    assert track not in in_memory_repo.search_tracks('gob')
+
+
+def test_search_index_removes_postings_of_a_track():
+    index = TrackSearchIndex()
+    track = Track(1, 'Quokka Quickstep')
+    index.add_tracks([track, Track(2, 'Quokka')])
+    index.remove_track(track)
+    assert index.candidates('quokka') == [2]
+    assert index.candidates('qui') == []
+    assert index.candidates('q') == [2]
+
+
 def test_add_review(in_memory_repo):
     t1 = in_memory_repo.get_track(144)
     t2 = in_memory_repo.get_track(145)
@@ -89,12 +170,34 @@ def test_add_review(in_memory_repo):
     assert in_memory_repo.get_reviews(t2) == [r2]
 
 
+def test_get_reviews_page_is_newest_first(in_memory_repo):
+    track = in_memory_repo.get_track(144)
+    reviews = [Review(track, f'Review {i}', 1 + i % 5) for i in range(25)]
+    for review in reviews:
+        in_memory_repo.add_review(review)
+    in_memory_repo.add_review(Review(in_memory_repo.get_track(145), 'Other track', 4))
+
+    assert in_memory_repo.get_number_of_reviews(track) == 25
+    assert in_memory_repo.get_reviews_page(track, 0, 10) == reviews[::-1][:10]
+    assert in_memory_repo.get_reviews_page(track, 20, 10) == reviews[4::-1]
+    assert in_memory_repo.get_reviews_page(track, 30, 10) == []
+    assert in_memory_repo.get_reviews_page(track, 0) == reviews[::-1]
+
+
 def test_add_playlist(in_memory_repo):
     playlist1 = PlayList(1, 'Mixtape')
     in_memory_repo.add_playlist(playlist1)
     assert in_memory_repo.get_playlist(1) == playlist1
 
 
+def test_get_playlist_by_normalized_name(in_memory_repo):
+    playlist1 = PlayList(1, 'Mixtape')
+    in_memory_repo.add_playlist(playlist1)
+    assert in_memory_repo.get_playlist_by_name('  MIXTAPE ') is playlist1
+    assert in_memory_repo.get_playlist_by_name('Mixtape2') is None
+    assert in_memory_repo.get_number_of_playlists() == 2
+
+
 def test_get_playlists(in_memory_repo):
     playlist1 = PlayList(1, 'Mixtape')
     playlist2 = PlayList(2, 'Mixtape2')
@@ -112,6 +215,14 @@ def test_add_track_to_playlist(in_memory_repo):
     assert in_memory_repo.get_playlist(1).tracks == [t1]
 
 
+def test_sample_tracks(in_memory_repo):
+    sample = in_memory_repo.sample_tracks(5)
+    assert len(sample) == 5
+    assert len(set(sample)) == 5
+    assert all(in_memory_repo.get_track(track.track_id) is track for track in sample)
+    assert len(in_memory_repo.sample_tracks(5000)) == 2000
+
+
 def test_create_random_playlist(in_memory_repo):
     p = in_memory_repo.create_random_playlist(10)
     assert len(p.tracks) == 10
@@ -139,3 +250,204 @@ def test_repository_can_add_album_get_albums(in_memory_repo):
     in_memory_repo.add_album(album)
     assert album in in_memory_repo.get_albums()
     assert len(in_memory_repo.get_albums()) == 428
+
+
+def test_catalogue_listings_stay_in_id_order(in_memory_repo):
+    in_memory_repo.add_artist(Artist(3, 'artist3'))
+    in_memory_repo.add_genre(Genre(1300, 'Chinese Style'))
+    in_memory_repo.add_genre(Genre(0, 'Genre zero'))
+    in_memory_repo.add_album(Album(3, 'Album three'))
+    for listing in (in_memory_repo.get_artists(), in_memory_repo.get_genres(), in_memory_repo.get_albums()):
+        assert listing == sorted(listing)
+        assert len(listing) == len(set(listing))
+    assert in_memory_repo.get_genres()[0].name == 'Genre zero'
+    assert in_memory_repo.get_genres_page(0, 5) == in_memory_repo.get_genres()[:5]
+
+
+def test_get_tracks_page(in_memory_repo):
+    tracks = in_memory_repo.get_tracks_page(15, 15)
+    assert len(tracks) == 15
+    assert tracks == in_memory_repo.get_tracks()[15:30]
+    assert in_memory_repo.get_tracks_page(1995, 15) == in_memory_repo.get_tracks()[1995:]
+
+
+def test_get_genres_page(in_memory_repo):
+    genres = in_memory_repo.get_genres_page(0, 20)
+    assert len(genres) == 20
+    assert genres == sorted(genres)
+    assert in_memory_repo.get_genres_page(20, 20)[0] > genres[-1]
+
+
+def test_get_tracks_keyset_page(in_memory_repo):
+    tracks = in_memory_repo.get_tracks()
+    page = in_memory_repo.get_tracks_keyset_page(15, after=tracks[14].track_id)
+    assert page == tracks[15:30]
+    assert in_memory_repo.get_tracks_keyset_page(15) == tracks[:15]
+    assert in_memory_repo.get_tracks_keyset_page(15, before=page[0].track_id) == tracks[:15]
+    assert in_memory_repo.get_tracks_keyset_page(15, after=tracks[-1].track_id) == []
+    assert in_memory_repo.get_tracks_keyset_page(15, before=tracks[3].track_id) == tracks[:3]
+
+
+def test_keyset_pages_stay_put_when_the_catalogue_changes(in_memory_repo):
+    tracks = in_memory_repo.get_tracks()
+    after = tracks[14].track_id
+    page = in_memory_repo.get_tracks_keyset_page(15, after=after)
+    in_memory_repo.add_track(Track(tracks[0].track_id - 1, 'Earlier song'))
+    assert in_memory_repo.get_tracks_keyset_page(15, after=after) == page
+
+
+def test_get_artists_genres_and_albums_keyset_pages(in_memory_repo):
+    artists = in_memory_repo.get_artists_page(0, 40)
+    assert in_memory_repo.get_artists_keyset_page(20, after=artists[19].artist_id) == artists[20:]
+    assert in_memory_repo.get_artists_keyset_page(20, before=artists[20].artist_id) == artists[:20]
+    genres = in_memory_repo.get_genres_page(0, 40)
+    assert in_memory_repo.get_genres_keyset_page(20, after=genres[19].genre_id) == genres[20:]
+    albums = in_memory_repo.get_albums_page(0, 40)
+    assert in_memory_repo.get_albums_keyset_page(20, after=albums[19].album_id) == albums[20:]
+
+    in_memory_repo.add_genre(Genre(0, 'First genre'))
+    assert in_memory_repo.get_genres_keyset_page(1)[0].genre_id == 0
+
+
+def copy_test_data(tmp_path):
+    from tests.conftest import TEST_DATA_PATH
+    for filename in ('raw_albums_excerpt.csv', 'raw_tracks_excerpt.csv'):
+        (tmp_path / filename).write_bytes((TEST_DATA_PATH / filename).read_bytes())
+    return tmp_path
+
+
+def test_populate_loads_catalogue_from_cache(tmp_path, monkeypatch):
+    from music.adapters import catalogue_cache, memory_repository
+    data_path = copy_test_data(tmp_path)
+    memory_repository.populate(data_path, MemoryRepository())
+    assert catalogue_cache.cache_filename(str(data_path / 'raw_tracks_excerpt.csv')).exists()
+
+    def fail_to_parse(self):
+        raise AssertionError('the catalogue should have been loaded from the cache')
+    monkeypatch.setattr(catalogue_cache.TrackCSVReader, 'read_csv_files', fail_to_parse)
+    repo = MemoryRepository()
+    memory_repository.populate(data_path, repo)
+    assert repo.get_number_of_tracks() == 2000
+    assert repo.get_track(2).artist.full_name == 'AWOL'
+    assert len(repo.get_artists()) == 263
+
+
+def test_changed_csv_invalidates_catalogue_cache(tmp_path):
+    from music.adapters import memory_repository
+    data_path = copy_test_data(tmp_path)
+    memory_repository.populate(data_path, MemoryRepository())
+
+    tracks_file = data_path / 'raw_tracks_excerpt.csv'
+    lines = tracks_file.read_bytes().splitlines(keepends=True)
+    tracks_file.write_bytes(b''.join(lines[:-1]))
+    repo = MemoryRepository()
+    memory_repository.populate(data_path, repo)
+    assert repo.get_number_of_tracks() == 1999
+
+
+def test_concurrent_catalogue_cache_writes_leave_a_whole_snapshot(tmp_path):
+    import threading
+    from music.adapters import catalogue_cache
+    cache_file = catalogue_cache.cache_filename(str(tmp_path / 'raw_tracks_excerpt.csv'))
+    key = ('key',)
+    catalogue = ([Track(track_id, f'Track {track_id}') for track_id in range(2000)], set(), set(), set())
+    writers = [threading.Thread(target=catalogue_cache.write_catalogue_cache, args=(cache_file, key, catalogue))
+               for _ in range(8)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    assert len(catalogue_cache.read_catalogue_cache(cache_file, key)[0]) == 2000
+    assert [path.name for path in tmp_path.iterdir()] == [cache_file.name]
+
+
+def test_populate_without_cache_streams_tracks(tmp_path):
+    from music.adapters import catalogue_cache, memory_repository
+    data_path = copy_test_data(tmp_path)
+    repo = MemoryRepository()
+    memory_repository.populate(data_path, repo, use_cache=False)
+    assert not catalogue_cache.cache_filename(str(data_path / 'raw_tracks_excerpt.csv')).exists()
+    assert repo.get_number_of_tracks() == 2000
+    assert len(repo.get_genres()) == 60
+    assert repo.search_tracks('amoebiasis') == [repo.get_track(144), repo.get_track(145)]
+
+
+@pytest.fixture
+def columnar_repo():
+    from tests.conftest import TEST_DATA_PATH
+    from music.adapters import memory_repository
+    repo = MemoryRepository(track_store='columnar')
+    memory_repository.populate(TEST_DATA_PATH, repo, use_cache=False)
+    return repo
+
+
+def track_fields(track: Track):
+    return (track.track_id, track.title, track.track_url, track.track_duration, track.artist, track.album,
+            track.genres)
+
+
+def test_columnar_track_store_matches_object_store(in_memory_repo, columnar_repo):
+    assert [track_fields(track) for track in columnar_repo.get_tracks()] == \
+           [track_fields(track) for track in in_memory_repo.get_tracks()]
+    assert track_fields(columnar_repo.get_track(144)) == track_fields(in_memory_repo.get_track(144))
+    assert columnar_repo.get_track(7) is None
+    assert columnar_repo.get_tracks_page(1995, 15) == in_memory_repo.get_tracks_page(1995, 15)
+    assert columnar_repo.get_tracks_keyset_page(15, after=144) == in_memory_repo.get_tracks_keyset_page(15, after=144)
+    assert columnar_repo.get_tracks_by_ids([144, 7, 2, 3]) == in_memory_repo.get_tracks_by_ids([144, 7, 2, 3])
+    artist = in_memory_repo.get_track(2).artist
+    assert columnar_repo.get_tracks_by_artist(artist) == in_memory_repo.get_tracks_by_artist(artist)
+    assert columnar_repo.search_tracks('amoebiasis') == in_memory_repo.search_tracks('amoebiasis')
+    assert columnar_repo.track_index(Track(144, None)) == in_memory_repo.track_index(Track(144, None))
+    assert columnar_repo.get_playlist(0).tracks == in_memory_repo.get_playlist(0).tracks
+    assert len(set(columnar_repo.sample_tracks(5))) == 5
+
+
+def test_columnar_track_store_adds_tracks_in_id_order(columnar_repo):
+    track = Track(1, 'Test song')
+    track.track_duration = 90
+    track.add_genre(Genre(1300, 'Chinese Style'))
+    columnar_repo.add_track(track)
+
+    stored = columnar_repo.get_track(1)
+    assert track_fields(stored) == track_fields(track)
+    assert stored is not columnar_repo.get_track(1)
+    assert columnar_repo.get_tracks_page(0, 1) == [track]
+    assert columnar_repo.get_number_of_tracks() == 2001
+    assert columnar_repo.get_track_ids_by_genre('Chinese Style') == [1]
+
+
+def test_unknown_track_store_is_rejected():
+    with pytest.raises(ValueError):
+        MemoryRepository(track_store='rows')
+
+
+@pytest.mark.parametrize('track_store', ['objects', 'columnar'])
+def test_replacing_a_track_de_indexes_the_old_one(track_store):
+    from tests.conftest import TEST_DATA_PATH
+    from music.adapters import memory_repository
+    repo = MemoryRepository(track_store=track_store)
+    memory_repository.populate(TEST_DATA_PATH, repo, use_cache=False)
+    artist = repo.get_track(2).artist
+    genre_name = repo.get_track(2).genres[0].name
+
+    repo.add_track(Track(2, 'Zzz'))
+
+    assert repo.get_track(2).title == 'Zzz'
+    assert repo.get_number_of_tracks() == 2000
+    assert 2 not in [track.track_id for track in repo.search_tracks('foo')]
+    assert repo.get_track(2) not in repo.get_tracks_by_artist(artist)
+    assert 2 not in repo.get_track_ids_by_genre(genre_name)
+    assert repo.search_tracks('zzz') == [repo.get_track(2)]
+
+
+@pytest.mark.parametrize('track_store', ['objects', 'columnar'])
+def test_load_tracks_sorts_and_deduplicates(track_store):
+    repo = MemoryRepository(track_store=track_store)
+    repo.load_tracks([Track(5, 'Five'), Track(2, 'Two'), Track(9, 'Nine'), Track(2, 'Second two')])
+    assert [track.track_id for track in repo.get_tracks_page(0, 10)] == [2, 5, 9]
+    assert [track.track_id for track in repo.get_tracks_keyset_page(10, after=2)] == [5, 9]
+    assert repo.get_track(2).title == 'Second two'
+    assert repo.track_index(Track(9, None)) == 2
+    assert repo.search_tracks('two') == [repo.get_track(2)]
+    assert repo.get_number_of_tracks() == 3
@@ -22,6 +22,17 @@ def test_can_get_tracks(in_memory_repo):
     assert len(tracks) == 2000
 
 
+def test_can_get_tracks_page(in_memory_repo):
+    tracks = tracks_services.get_tracks_page(0, 15, in_memory_repo)
+    assert len(tracks) == 15
+    assert tracks[0]['title'] == 'Food'
+
+
+def test_can_get_albums_page(in_memory_repo):
+    albums = tracks_services.get_albums_page(20, 20, in_memory_repo)
+    assert albums == tracks_services.get_albums(in_memory_repo)[20:40]
+
+
 def test_can_get_tracks_by_genre(in_memory_repo):
     tracks = tracks_services.get_track_by_genre('Jazz', in_memory_repo)
     assert len(tracks) == 31
@@ -100,6 +111,20 @@ def test_add_review(in_memory_repo):
     assert tracks_services.get_reviews(2, in_memory_repo)[0].track.track_id == track['track_id']
 
 
+def test_get_reviews_pages_newest_first(in_memory_repo):
+    for i in range(12):
+        tracks_services.add_review(2, f'Review {i}', 5, in_memory_repo)
+    assert tracks_services.get_number_of_reviews(2, in_memory_repo) == 12
+
+    first_page = tracks_services.get_reviews(2, in_memory_repo, 0, 10)
+    assert [review.review_text for review in first_page] == [f'Review {i}' for i in range(11, 1, -1)]
+    second_page = tracks_services.get_reviews(2, in_memory_repo, 10, 10)
+    assert [review.review_text for review in second_page] == ['Review 1', 'Review 0']
+
+    with pytest.raises(tracks_services.NonExistentTrackException):
+        tracks_services.get_reviews(7, in_memory_repo)
+
+
 def test_get_tracks_by_ids(in_memory_repo):
     tracks = tracks_services.get_tracks_by_ids([2, 3, 144], in_memory_repo)
     assert len(tracks) == 3
@@ -118,6 +143,13 @@ def test_get_playlists(in_memory_repo):
     assert len(tracks_services.get_playlists(in_memory_repo)) == 3
 
 
+def test_add_playlist_with_existing_name_is_rejected(in_memory_repo):
+    tracks_services.add_playlist('Mixtape', in_memory_repo)
+    with pytest.raises(tracks_services.TitleNotUnique):
+        tracks_services.add_playlist(' mixtape ', in_memory_repo)
+    assert len(tracks_services.get_playlists(in_memory_repo)) == 2
+
+
 def test_add_track_to_playlist(in_memory_repo):
     tracks_services.add_playlist('Mixtape', in_memory_repo)
     tracks_services.add_track_to_playlist(1, 144, in_memory_repo)
@@ -196,4 +228,5 @@ def test_can_get_list_of_albums(in_memory_repo):
 
 def test_get_random_tracks(in_memory_repo):
     tracks = tracks_services.get_random_tracks(in_memory_repo)
-    assert len(tracks) == 5
\ No newline at end of file
+    assert len(tracks) == 5
+    assert len({track.track_id for track in tracks}) == 5
\ No newline at end of file
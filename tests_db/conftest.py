@@ -52,6 +52,18 @@ def session_factory():
     yield session_factory
     metadata.drop_all(engine)
 
+@pytest.fixture
+def bulk_session_factory():
+    clear_mappers()
+    engine = create_engine(TEST_DATABASE_URI_IN_MEMORY)
+    metadata.create_all(engine)
+    map_model_to_tables()
+    session_factory = sessionmaker(autocommit=False, autoflush=True, bind=engine)
+    repo_instance = database_repository.SqlAlchemyRepository(session_factory)
+    repository_populate.populate(TEST_DATA_PATH_DATABASE_LIMITED, repo_instance, False, bulk=True)
+    yield session_factory
+    metadata.drop_all(engine)
+
 @pytest.fixture
 def empty_session():
     clear_mappers()
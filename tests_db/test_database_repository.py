@@ -1,9 +1,14 @@
+import threading
 from datetime import date, datetime
 
 import pytest
 
 import music.adapters.repository as repo
-from music.adapters.database_repository import SqlAlchemyRepository
+from music.adapters import database_repository
+from music.adapters.database_repository import (
+    SqlAlchemyRepository, create_database_engine, enable_sqlite_performance_profile
+)
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
 from music.domainmodel.artist import Artist
 from music.domainmodel.album import Album
 from music.domainmodel.track import Track
@@ -75,6 +80,44 @@ def test_search_tracks(session_factory):
     result = repo.search_tracks(searchstring)
     assert [track] == result
 
+def test_search_tracks_by_genre_artist_and_album(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    assert [t.track_id for t in repo.search_tracks('experimental')] == [20, 30]
+    assert [t.track_id for t in repo.search_tracks('KURT')] == [10]
+    assert [t.track_id for t in repo.search_tracks('lace')] == [137, 138]
+    assert [t.track_id for t in repo.search_tracks('ss')] == [139]
+    assert repo.search_tracks('no such track') == []
+
+def test_search_tracks_finds_added_track(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    track = Track(1, 'Quokka Quickstep')
+    track.genres.append(repo.get_genres()[0])
+    repo.add_track(track)
+    assert repo.search_tracks('quokka') == [track]
+    assert track in repo.search_tracks(repo.get_genres()[0].name)
+
+def test_search_tracks_folds_case_of_short_non_ascii_queries(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    track = Track(1, 'Émile Étude')
+    repo.add_track(track)
+    assert repo.search_tracks('ém') == [track]
+    assert repo.search_tracks('é') == [track]
+    assert repo.search_tracks('étu') == [track]
+    assert repo.get_track(2) in repo.search_tracks('fo')
+
+def test_search_tracks_without_search_index(session_factory):
+    # SQLite builds older than 3.34 or without FTS5 have no track_search table and filter the tracks in Python.
+    session_factory().bind.execute('DROP TABLE IF EXISTS track_search')
+    repo = SqlAlchemyRepository(session_factory)
+    assert not repo.has_search_index()
+    track = Track(1, 'Émile Étude')
+    repo.add_track(track)
+    assert [t.track_id for t in repo.search_tracks('experimental')] == [20, 30]
+    assert [t.track_id for t in repo.search_tracks('ss')] == [139]
+    assert repo.search_tracks('é') == [track]
+    repo.rebuild_search_index()
+    assert repo.search_tracks('no such track') == []
+
 def test_get_tracks(session_factory):
     repo = SqlAlchemyRepository(session_factory)
     result = repo.get_tracks()
@@ -100,6 +143,54 @@ def test_add_playlist_and_get_playlist_and_get_playlists(session_factory):
     assert len(repo.get_playlist(1).tracks) == 2
     assert len(repo.get_playlists()) == 2
 
+def test_get_tracks_by_ids(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    tracks = repo.get_tracks_by_ids([139, 4, 2, 20])
+    assert [track.track_id for track in tracks] == [139, 2, 20]
+    assert repo.get_tracks_by_ids([]) == []
+
+def test_sample_tracks(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    sample = repo.sample_tracks(5)
+    assert len(sample) == 5
+    assert len(set(sample)) == 5
+    assert sorted(track.track_id for track in repo.sample_tracks(20)) == [2, 3, 5, 10, 20, 30, 134, 137, 138, 139]
+
+def test_sample_tracks_with_sparse_ids(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    for track_id in range(1000, 5001, 500):
+        repo.add_track(Track(track_id, f'Track {track_id}'))
+    for _ in range(20):
+        sample = repo.sample_tracks(30)
+        assert len(sample) == 19
+        assert len(set(sample)) == 19
+
+def test_sample_tracks_falls_back_to_random_order(session_factory, monkeypatch):
+    monkeypatch.setattr(database_repository, 'SAMPLE_ROUNDS', 0)
+    repo = SqlAlchemyRepository(session_factory)
+    sample = repo.sample_tracks(4)
+    assert len(sample) == 4
+    assert len(set(sample)) == 4
+
+def test_get_playlist_by_name(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    p = PlayList(1, 'Test Playlist')
+    repo.add_playlist(p)
+    assert repo.get_playlist_by_name(' test playlist') == p
+    assert repo.get_playlist_by_name('Other Playlist') is None
+    assert repo.get_number_of_playlists() == 2
+
+def test_playlist_names_are_unique_after_normalizing(session_factory):
+    from music.tracks import services as tracks_services
+    repo = SqlAlchemyRepository(session_factory)
+    for name in (' Mixtape ', 'Été'):
+        tracks_services.add_playlist(name, repo)
+        with pytest.raises(tracks_services.TitleNotUnique):
+            tracks_services.add_playlist(name, repo)
+    assert repo.get_playlist_by_name('MIXTAPE').name == ' Mixtape '
+    assert repo.get_playlist_by_name(' ÉTÉ').name == 'Été'
+    assert repo.get_number_of_playlists() == 3
+
 def test_empty_playlist(session_factory):
     repo = SqlAlchemyRepository(session_factory)
     p = PlayList(1, 'Test Playlist')
@@ -132,6 +223,20 @@ def test_add_review(session_factory):
     repo.add_review(r)
     result = repo.get_reviews(t1)
     assert [r] == result
+
+def test_get_reviews_page(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    t1 = repo.get_track(2)
+    t2 = repo.get_track(3)
+    reviews = [Review(t1, f'Review {i}', 5) for i in range(5)]
+    for review in reviews:
+        repo.add_review(review)
+    repo.add_review(Review(t2, 'Other track', 4))
+
+    assert repo.get_reviews(t1) == reviews
+    assert repo.get_number_of_reviews(t1) == 5
+    assert repo.get_reviews_page(t1, 0, 3) == reviews[:1:-1]
+    assert repo.get_reviews_page(t1, 3, 3) == reviews[1::-1]
 def test_get_user(session_factory):
     repo = SqlAlchemyRepository(session_factory)
     user = User(1, 'Dave', '123456789')
@@ -160,6 +265,8 @@ def test_add_genre_and_get_genres(session_factory):
     genre = Genre(0, 'MyGenre')
     repo.add_genre(genre)
     assert genre in repo.get_genres()
+    assert repo.get_genres()[0] == genre
+    assert repo.get_genres() == sorted(repo.get_genres())
 
 def test_get_album(session_factory):
     repo = SqlAlchemyRepository(session_factory)
@@ -175,4 +282,68 @@ def test_get_number_of_genres(session_factory):
 def test_get_number_of_albums(session_factory):
     repo = SqlAlchemyRepository(session_factory)
     albums_number = repo.get_number_of_albums()
-    assert albums_number == 5
\ No newline at end of file
+    assert albums_number == 5
+def test_get_tracks_page(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    tracks = repo.get_tracks_page(2, 3)
+    assert [track.track_id for track in tracks] == [5, 10, 20]
+    assert len(repo.get_tracks_page(8, 5)) == 2
+
+def test_get_artists_page(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    artists = repo.get_artists_page(0, 3)
+    assert len(artists) == 3
+    assert artists == sorted(artists)
+
+def test_get_tracks_keyset_page(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    assert [track.track_id for track in repo.get_tracks_keyset_page(3)] == [2, 3, 5]
+    assert [track.track_id for track in repo.get_tracks_keyset_page(3, after=5)] == [10, 20, 30]
+    assert [track.track_id for track in repo.get_tracks_keyset_page(2, before=10)] == [3, 5]
+    assert [track.track_id for track in repo.get_tracks_keyset_page(3, after=137)] == [138, 139]
+
+def test_get_artists_genres_and_albums_keyset_pages(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    artists = repo.get_artists_page(0, 4)
+    assert repo.get_artists_keyset_page(2, after=artists[1].artist_id) == artists[2:]
+    assert repo.get_artists_keyset_page(2, before=artists[2].artist_id) == artists[:2]
+    genres = repo.get_genres_page(0, 4)
+    assert repo.get_genres_keyset_page(2, after=genres[1].genre_id) == genres[2:]
+    albums = repo.get_albums_page(0, 4)
+    assert repo.get_albums_keyset_page(2, after=albums[1].album_id) == albums[2:]
+
+def test_create_database_engine_pools(tmp_path):
+    assert isinstance(create_database_engine('sqlite://').pool, NullPool)
+    assert isinstance(create_database_engine('sqlite://', pool='queue').pool, StaticPool)
+    engine = create_database_engine(f'sqlite:///{tmp_path / "music.db"}', pool='queue', pool_size=3, max_overflow=1)
+    assert isinstance(engine.pool, QueuePool)
+    assert engine.pool.size() == 3
+    with pytest.raises(ValueError):
+        create_database_engine('sqlite://', pool='shared')
+
+def test_reset_session_reuses_session_and_empties_it(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    registry = repo._session_cm.session
+    track = repo.get_track(2)
+    assert track in registry
+    repo.reset_session()
+    assert repo._session_cm.session is registry
+    assert track not in registry
+
+def test_reset_session_leaves_other_threads_sessions_open(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    track = repo.get_track(2)
+    thread = threading.Thread(target=repo.reset_session)
+    thread.start()
+    thread.join()
+    assert track in repo._session_cm.session
+
+def test_sqlite_performance_profile_is_applied_on_connect(tmp_path):
+    engine = create_database_engine(f'sqlite:///{tmp_path / "music.db"}')
+    enable_sqlite_performance_profile(engine, cache_size=-2000, mmap_size=1 << 20)
+    with engine.connect() as connection:
+        assert connection.execute('PRAGMA journal_mode').scalar() == 'wal'
+        assert connection.execute('PRAGMA synchronous').scalar() == 1
+        assert connection.execute('PRAGMA cache_size').scalar() == -2000
+        assert connection.execute('PRAGMA mmap_size').scalar() == 1 << 20
+        assert connection.execute('PRAGMA temp_store').scalar() == 2
@@ -2,7 +2,9 @@ import pytest
 
 import datetime
 
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.exc import IntegrityError
+from music.adapters.orm import metadata, upgrade_schema, schema_version, SCHEMA_VERSION
 from music.domainmodel.user import User
 from music.domainmodel.track import Track
 from music.domainmodel.album import Album
@@ -80,6 +82,18 @@ def test_saving_of_track(empty_session):
     rows = list(empty_session.execute('SELECT track_id, title FROM tracks'))
     assert rows == [(1, 'Food')]
 
+def test_saving_of_trusted_track(empty_session):
+    # Mapped classes build trusted objects through their instrumented constructors, so they persist as usual.
+    album = Album.from_trusted(4, 'Niris', release_year=2009)
+    track = Track.from_trusted(1, 'Food', artist=Artist.from_trusted(2, 'ME'), album=album, track_duration=168,
+                               genres=[Genre.from_trusted(21, 'Hip-Hop')])
+    empty_session.add(track)
+    empty_session.commit()
+
+    rows = list(empty_session.execute('SELECT track_id, title, track_duration, artist_id, album_id FROM tracks'))
+    assert rows == [(1, 'Food', 168, 2, 4)]
+    assert list(empty_session.execute('SELECT track_id, genre_id FROM track_genre')) == [(1, 21)]
+
 def test_saving_of_album(empty_session):
     album = Album(4, 'Niris')
     empty_session.add(album)
@@ -151,3 +165,45 @@ def test_saving_of_playlist(empty_session):
     assert playlist == ('mylist',)
 
 
+
+def test_upgrade_schema_rebuilds_artists_and_adds_indexes():
+    engine = create_engine('sqlite://')
+    # Tables as created before revision 1, with artists keyed by (artist_id, full_name).
+    engine.execute('CREATE TABLE artists (artist_id INTEGER NOT NULL, full_name VARCHAR(255) NOT NULL, '
+                   'PRIMARY KEY (artist_id, full_name))')
+    engine.execute('CREATE TABLE tracks (track_id INTEGER NOT NULL, title VARCHAR(255), track_duration INTEGER, '
+                   'track_url VARCHAR(255), artist_id INTEGER, album_id INTEGER, PRIMARY KEY (track_id), '
+                   'FOREIGN KEY(artist_id) REFERENCES artists (artist_id))')
+    engine.execute("INSERT INTO artists VALUES (1, 'AWOL'), (2, 'Kurt Vile')")
+    engine.execute("INSERT INTO tracks (track_id, title, artist_id) VALUES (2, 'Food', 1)")
+    metadata.create_all(engine)
+
+    upgrade_schema(engine)
+
+    assert schema_version(engine) == SCHEMA_VERSION
+    assert inspect(engine).get_pk_constraint('artists')['constrained_columns'] == ['artist_id']
+    assert list(engine.execute('SELECT artist_id, full_name FROM artists')) == [(1, 'AWOL'), (2, 'Kurt Vile')]
+    assert 'REFERENCES artists ' in engine.execute("SELECT sql FROM sqlite_master WHERE name = 'tracks'").scalar()
+    index_names = {row[0] for row in engine.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {index.name for table in metadata.sorted_tables for index in table.indexes} <= index_names
+
+    # Upgrading an up to date database changes nothing.
+    upgrade_schema(engine)
+    assert list(engine.execute('SELECT artist_id, full_name FROM artists')) == [(1, 'AWOL'), (2, 'Kurt Vile')]
+
+
+def test_upgrade_schema_fills_playlist_name_keys():
+    engine = create_engine('sqlite://')
+    # The playlists table as created by revision 1, looked up through an index on lower(name).
+    engine.execute('CREATE TABLE playlists (playlist_id INTEGER NOT NULL, name VARCHAR(255), PRIMARY KEY (playlist_id))')
+    engine.execute('CREATE INDEX ix_playlists_name_lower ON playlists (lower(name))')
+    engine.execute("INSERT INTO playlists (playlist_id, name) VALUES (1, 'Été'), (2, NULL)")
+    engine.execute('PRAGMA user_version = 1')
+    metadata.create_all(engine)
+
+    upgrade_schema(engine)
+
+    assert schema_version(engine) == SCHEMA_VERSION
+    assert list(engine.execute('SELECT playlist_id, name_key FROM playlists ORDER BY playlist_id')) == [(1, 'été'), (2, None)]
+    index_names = {row[0] for row in engine.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert 'ix_playlists_name_key' in index_names and 'ix_playlists_name_lower' not in index_names
@@ -1,12 +1,31 @@
+import pytest
 from sqlalchemy import select, inspect
+from sqlalchemy.orm import sessionmaker
 
 from music.adapters.orm import metadata
+from music.adapters.database_repository import SqlAlchemyRepository
+
+def has_search_index(engine) -> bool:
+    # track_search is only created when the SQLite build supports FTS5 trigram indexes.
+    return SqlAlchemyRepository(sessionmaker(bind=engine)).has_search_index()
 
 def test_database_populate_inspect_table_names(database_engine):
 
     # Get table information
     inspector = inspect(database_engine)
-    assert inspector.get_table_names() == ['albums', 'artists', 'genres', 'playlists', 'reviews', 'track_genre', 'track_playlist', 'tracks',  'users']
+    search_tables = []
+    if has_search_index(database_engine):
+        search_tables = ['track_search', 'track_search_config', 'track_search_content',
+                         'track_search_data', 'track_search_docsize', 'track_search_idx']
+    assert inspector.get_table_names() == sorted(['albums', 'artists', 'genres', 'playlists', 'reviews', 'track_genre',
+                                                  'track_playlist', 'tracks', 'users'] + search_tables)
+
+def test_database_populate_builds_search_index(database_engine):
+    if not has_search_index(database_engine):
+        pytest.skip('SQLite build without FTS5 trigram support')
+    with database_engine.connect() as connection:
+        nr = connection.execute('SELECT count(*) FROM track_search').scalar()
+        assert nr == 10
 
 def test_database_populate_select_all_tracks(database_engine):
     with database_engine.connect() as connection:
@@ -76,3 +95,19 @@ def test_database_populate_select_all_playlists(database_engine):
 
         nr = len(playlists)
         assert nr == 1
+
+def test_bulk_populate_loads_full_catalogue(bulk_session_factory):
+    session = bulk_session_factory()
+    assert session.execute('SELECT count(*) FROM tracks').scalar() == 2000
+    assert session.execute('SELECT count(*) FROM artists').scalar() == 263
+    assert session.execute('SELECT count(*) FROM albums').scalar() == 427
+    assert session.execute('SELECT count(*) FROM genres').scalar() == 60
+    assert session.execute('SELECT count(*) FROM playlists').scalar() == 1
+
+def test_bulk_populate_links_tracks(bulk_session_factory):
+    repo = SqlAlchemyRepository(bulk_session_factory)
+    track = repo.get_track(2)
+    assert track.artist.full_name == 'AWOL'
+    assert track.album.title == 'AWOL - A Way Of Life'
+    assert [genre.name for genre in track.genres] == ['Hip-Hop']
+    assert track in repo.search_tracks('hip-hop')
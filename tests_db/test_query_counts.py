@@ -0,0 +1,67 @@
+import pytest
+
+from sqlalchemy import event
+
+import music.adapters.repository as repo
+from music import create_app
+from music.adapters.database_repository import SqlAlchemyRepository
+from tests.conftest import TEST_DATA_PATH
+
+# Statements a rendered listing page may issue once related objects are eager loaded: counting, the listing
+# itself with one select per eager loaded relationship, and the random sidebar picks.
+MAX_STATEMENTS_PER_PAGE = 15
+
+
+@pytest.fixture
+def database_client(bulk_session_factory):
+    app = create_app({
+        'TESTING': True,
+        'TEST_DATA_PATH': TEST_DATA_PATH,
+        'WTF_CSRF_ENABLED': False
+    })
+    engine = bulk_session_factory.kw['bind']
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', count_statement)
+    yield app.test_client(), statements
+    event.remove(engine, 'before_cursor_execute', count_statement)
+
+
+def render(database_client, session_factory, track_loading, method, url, **kwargs):
+    client, statements = database_client
+    repo.repo_instance = SqlAlchemyRepository(session_factory, track_loading=track_loading)
+    statements.clear()
+    response = getattr(client, method)(url, **kwargs)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def most_prolific_artist_id(session_factory):
+    tracks = SqlAlchemyRepository(session_factory, track_loading='lazy').get_tracks()
+    artist_ids = [track.artist.artist_id for track in tracks]
+    return max(set(artist_ids), key=artist_ids.count)
+
+
+@pytest.mark.parametrize('track_loading', ['selectin', 'joined'])
+def test_listing_pages_issue_a_bounded_number_of_statements(database_client, bulk_session_factory, track_loading):
+    artist_id = most_prolific_artist_id(bulk_session_factory)
+    pages = [
+        ('get', '/tracks', {}),
+        ('get', '/tracks?after=1829', {}),
+        ('get', f'/byartist/{artist_id}', {}),
+        ('get', '/playlist/0', {}),
+        ('post', '/search', {'data': {'search': 'rock'}}),
+    ]
+    for method, url, kwargs in pages:
+        lazy = render(database_client, bulk_session_factory, 'lazy', method, url, **kwargs)
+        eager = render(database_client, bulk_session_factory, track_loading, method, url, **kwargs)
+        assert eager <= MAX_STATEMENTS_PER_PAGE, url
+        assert eager < lazy, url
+
+
+def test_unknown_track_loading_strategy_is_rejected(bulk_session_factory):
+    with pytest.raises(ValueError):
+        SqlAlchemyRepository(bulk_session_factory, track_loading='eager')
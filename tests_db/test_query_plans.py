@@ -0,0 +1,71 @@
+import pytest
+
+from sqlalchemy import event
+
+from music.adapters.database_repository import SqlAlchemyRepository
+from music.domainmodel.review import Review
+from music.domainmodel.user import User
+
+
+def repository_queries(repo):
+    # Each query runs in a fresh session, so objects it needs are looked up inside it.
+    artist_id = repo.get_track(2).artist.artist_id
+    yield lambda: repo.get_track(2)
+    yield lambda: repo.get_tracks_by_ids([2, 3, 139])
+    yield lambda: repo.get_tracks_keyset_page(15, after=5)
+    yield lambda: repo.get_tracks_keyset_page(15, before=139)
+    yield lambda: repo.get_artists_keyset_page(20, after=artist_id)
+    yield lambda: repo.get_genres_keyset_page(20, after=1)
+    yield lambda: repo.get_albums_keyset_page(20, before=10)
+    yield lambda: repo.get_tracks_by_artist(repo.get_artist(artist_id))
+    yield lambda: repo.search_tracks('live')
+    yield lambda: repo.get_reviews(repo.get_track(2))
+    yield lambda: repo.get_reviews_page(repo.get_track(2), 0, 10)
+    yield lambda: repo.get_number_of_reviews(repo.get_track(2))
+    yield lambda: repo.get_playlist(0)
+    yield lambda: repo.get_playlist_by_name("developers' picks")
+    yield lambda: repo.get_user('dave')
+    yield lambda: repo.sample_tracks(3)
+
+
+def query_plans(engine, statements):
+    connection = engine.raw_connection()
+    try:
+        for statement, parameters in statements:
+            if statement.lstrip().upper().startswith('SELECT'):
+                rows = connection.cursor().execute('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+                yield statement, [row[3] for row in rows]
+    finally:
+        connection.close()
+
+
+def is_full_scan(detail: str) -> bool:
+    # SCAN without an index reads every row of a table; automatic indexes are built by a full scan per query.
+    # The schema catalogue sqlite_master is only probed for the search index and is not repository data.
+    if detail.startswith('SCAN '):
+        return 'USING' not in detail and 'VIRTUAL TABLE' not in detail and \
+               detail not in ('SCAN CONSTANT ROW', 'SCAN sqlite_master')
+    return 'AUTOMATIC' in detail or 'USE TEMP B-TREE' in detail
+
+
+@pytest.mark.parametrize('track_loading', ['selectin', 'joined', 'lazy'])
+def test_repository_queries_use_indexes(session_factory, track_loading):
+    repo = SqlAlchemyRepository(session_factory, track_loading=track_loading)
+    repo.add_review(Review(repo.get_track(2), 'Test Review', 5))
+    repo.add_user(User(1, 'dave', '123456789'))
+    engine = session_factory.kw['bind']
+
+    for query in repository_queries(repo):
+        repo.reset_session()
+        statements = []
+
+        def record_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(engine, 'before_cursor_execute', record_statement)
+        query()
+        event.remove(engine, 'before_cursor_execute', record_statement)
+
+        assert statements
+        for statement, plan in query_plans(engine, statements):
+            assert not any(is_full_scan(detail) for detail in plan), (statement, plan)